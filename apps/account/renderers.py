@@ -1,13 +1,22 @@
-from rest_framework import renderers
-import json
+from rest_framework.exceptions import ErrorDetail
+from common.renderers import FastJSONRenderer
 
-class UserRenderer(renderers.JSONRenderer):
+
+def contains_error_detail(data):
+  """True if a validation error detail is nested anywhere in the payload"""
+  if isinstance(data, ErrorDetail):
+    return True
+  if isinstance(data, dict):
+    return any(contains_error_detail(value) for value in data.values())
+  if isinstance(data, (list, tuple)):
+    return any(contains_error_detail(item) for item in data)
+  return False
+
+
+class UserRenderer(FastJSONRenderer):
   charset='utf-8'
   def render(self, data, accepted_media_type=None, renderer_context=None):
-    response = ''
-    if 'ErrorDetail' in str(data):
-      response = json.dumps({'errors':data})
-    else:
-      response = json.dumps(data)
-    
-    return response
\ No newline at end of file
+    if contains_error_detail(data):
+      data = {'errors': data}
+
+    return super().render(data, accepted_media_type, renderer_context)
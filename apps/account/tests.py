@@ -1,3 +1,25 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 
-# Create your tests here.
+from .renderers import UserRenderer
+from .serializers import UserLoginSerializer
+
+
+class UserRendererTests(SimpleTestCase):
+    def test_errors_are_enveloped_like_json_renderer_would(self):
+        serializer = UserLoginSerializer(data={'email': 'not-an-email'})
+        self.assertFalse(serializer.is_valid())
+        errors = serializer.errors
+
+        self.assertEqual(UserRenderer().render(errors), JSONRenderer().render({'errors': errors}))
+
+    def test_nested_error_details_are_enveloped(self):
+        errors = {'bookings': [{}, ValidationError({'address': 'Required'}).detail]}
+
+        self.assertEqual(UserRenderer().render(errors), JSONRenderer().render({'errors': errors}))
+
+    def test_other_payloads_render_unchanged(self):
+        data = {'msg': 'Login Success', 'token': {'access': 'a', 'refresh': 'r'}}
+
+        self.assertEqual(UserRenderer().render(data), JSONRenderer().render(data))
@@ -1,14 +1,18 @@
 from django.contrib import admin
+from common.exports import ExportCsvMixin
 from .models import ContactSubmission, ContactMethod, OfficeLocation
 
 
 @admin.register(ContactSubmission)
-class ContactSubmissionAdmin(admin.ModelAdmin):
+class ContactSubmissionAdmin(ExportCsvMixin, admin.ModelAdmin):
     list_display = ('full_name', 'email', 'service_type', 'created_at', 'is_resolved')
     list_filter = ('service_type', 'is_resolved', 'created_at')
     search_fields = ('full_name', 'email', 'phone_number')
     list_editable = ('is_resolved',)
     readonly_fields = ('created_at',)
+    export_fields = (
+        'id', 'created_at', 'full_name', 'email', 'phone_number', 'service_type', 'message', 'is_resolved',
+    )
 
 
 # apps/contact_us/admin.py
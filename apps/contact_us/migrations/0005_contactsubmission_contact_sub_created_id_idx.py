@@ -0,0 +1,17 @@
+# Generated by Django 6.0a1 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact_us', '0004_alter_contactmethod_action_text_ar_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactsubmission',
+            index=models.Index(fields=['created_at', 'id'], name='contact_sub_created_id_idx'),
+        ),
+    ]
@@ -18,6 +18,11 @@ class ContactSubmission(BaseModel):
     message = models.TextField()
     is_resolved = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='contact_sub_created_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.full_name} - {self.service_type}"
 
@@ -3,6 +3,7 @@ from .models import ContactSubmission, ContactMethod, OfficeLocation
 from django.core.validators import RegexValidator
 import re
 from django.utils import timezone
+from common.localization import LocalizedField, context_language
 
 
 class ContactSubmissionSerializer(serializers.ModelSerializer):
@@ -203,9 +204,9 @@ class ContactSubmissionSerializer(serializers.ModelSerializer):
 
 
 class ContactMethodSerializer(serializers.ModelSerializer):
-    title_display = serializers.SerializerMethodField()
-    description_display = serializers.SerializerMethodField()
-    action_text_display = serializers.SerializerMethodField()
+    title_display = LocalizedField(source='title')
+    description_display = LocalizedField(source='description')
+    action_text_display = LocalizedField(source='action_text')
 
     class Meta:
         model = ContactMethod
@@ -221,43 +222,14 @@ class ContactMethodSerializer(serializers.ModelSerializer):
             'order'
         ]
 
-    def get_title_display(self, obj):
-        language = self._get_language()
-        return obj.title_ar if language == 'ar' and obj.title_ar else obj.title
-
-    def get_description_display(self, obj):
-        language = self._get_language()
-        return obj.description_ar if language == 'ar' and obj.description_ar else obj.description
-
-    def get_action_text_display(self, obj):
-        language = self._get_language()
-        if language == 'ar' and obj.action_text_ar:
-            return obj.action_text_ar
-        return obj.action_text or ""
-
-    def _get_language(self):
-        """Extract language from request query parameters or headers"""
-        request = self.context.get('request')
-        if request:
-            # Check query parameter first
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-
-            # Check Accept-Language header
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-
-        return 'en'  # Default to English
 
 class OfficeLocationSerializer(serializers.ModelSerializer):
-    title_display = serializers.SerializerMethodField()
-    description_display = serializers.SerializerMethodField()
-    office_name_display = serializers.SerializerMethodField()
-    office_address_display = serializers.SerializerMethodField()
-    working_hours_name_display = serializers.SerializerMethodField()
-    working_hours_weekdays_display = serializers.SerializerMethodField()
+    title_display = LocalizedField(source='title')
+    description_display = LocalizedField(source='description')
+    office_name_display = LocalizedField(source='office_name')
+    office_address_display = LocalizedField(source='office_address')
+    working_hours_name_display = LocalizedField(source='working_hours_name')
+    working_hours_weekdays_display = LocalizedField(source='working_hours_weekdays')
     full_address = serializers.SerializerMethodField()
 
     class Meta:
@@ -276,52 +248,12 @@ class OfficeLocationSerializer(serializers.ModelSerializer):
             'is_primary'
         ]
 
-    def get_title_display(self, obj):
-        language = self._get_language()
-        return obj.title_ar if language == 'ar' and obj.title_ar else obj.title
-
-    def get_description_display(self, obj):
-        language = self._get_language()
-        return obj.description_ar if language == 'ar' and obj.description_ar else obj.description
-
-    def get_office_name_display(self, obj):
-        language = self._get_language()
-        return obj.office_name_ar if language == 'ar' and obj.office_name_ar else obj.office_name
-
-    def get_office_address_display(self, obj):
-        language = self._get_language()
-        return obj.office_address_ar if language == 'ar' and obj.office_address_ar else obj.office_address
-
-    def get_working_hours_name_display(self, obj):
-        language = self._get_language()
-        return obj.working_hours_name_ar if language == 'ar' and obj.working_hours_name_ar else obj.working_hours_name
-
-    def get_working_hours_weekdays_display(self, obj):
-        language = self._get_language()
-        return obj.working_hours_weekdays_ar if language == 'ar' and obj.working_hours_weekdays_ar else obj.working_hours_weekdays
-
     def get_full_address(self, obj):
-        language = self._get_language()
-        if language == 'ar':
+        if context_language(self.context) == 'ar':
             return f"{obj.office_name_ar}, {obj.office_address_ar}"
         else:
             return f"{obj.office_name}, {obj.office_address}"
 
-    def _get_language(self):
-        """Extract language from request query parameters or headers"""
-        request = self.context.get('request')
-        if request:
-            # Check query parameter first
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-
-            # Check Accept-Language header
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-
-        return 'en'  # Default to English
 
 class ContactInfoSerializer(serializers.Serializer):
     contact_methods = ContactMethodSerializer(many=True, read_only=True)
@@ -330,17 +262,7 @@ class ContactInfoSerializer(serializers.Serializer):
 
     def get_current_language(self, obj):
         """Get language from the serializer context"""
-        request = self.context.get('request')
-        if request:
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-
-        return 'en'
+        return context_language(self.context)
 
     def to_representation(self, instance):
         """Override to properly structure the data"""
@@ -3,5 +3,6 @@ from . import views
 
 urlpatterns = [
     path('submit/', views.ContactSubmissionCreateView.as_view(), name='contact-submit'),
+    path('submissions/', views.ContactSubmissionListView.as_view(), name='contact-submission-list'),
     path('info/', views.ContactInfoView.as_view(), name='contact-info')
 ]
\ No newline at end of file
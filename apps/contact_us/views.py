@@ -1,7 +1,13 @@
-from rest_framework import status
+from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import  ContactMethod, OfficeLocation
+from .models import  ContactMethod, OfficeLocation, ContactSubmission
+from apps.service import catalog, prerender
+from common.conditional import conditional_get
+from common.idempotency import idempotent
+from common.localization import resolve_language, for_language
+from common.pagination import KeysetPagination
+from common.streaming import StreamingListMixin
 from .serializers import (
     ContactSubmissionSerializer,
     ContactMethodSerializer,
@@ -9,6 +15,7 @@ from .serializers import (
 )
 
 class ContactSubmissionCreateView(APIView):
+    @idempotent
     def post(self, request, *args, **kwargs):
         serializer = ContactSubmissionSerializer(data=request.data)
 
@@ -27,12 +34,26 @@ class ContactSubmissionCreateView(APIView):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ContactSubmissionListView(StreamingListMixin, generics.ListAPIView):
+    """Contact submissions for staff, newest first; ``?stream=1`` for all of them"""
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = ContactSubmissionSerializer
+    pagination_class = KeysetPagination
+    queryset = ContactSubmission.objects.all()
+
+
 class ContactInfoView(APIView):
+    @conditional_get(catalog.response_version)
     def get(self, request):
+        language = resolve_language(request)
+        response = prerender.prerendered_response(request, prerender.contact_info_key(language))
+        if response is not None:
+            return response
+
         # Get active contact methods
-        contact_methods = ContactMethod.objects.filter(is_active=True)
+        contact_methods = for_language(ContactMethod.objects.filter(is_active=True), language)
         # Get office locations
-        office_locations = OfficeLocation.objects.all()
+        office_locations = for_language(OfficeLocation.objects.all(), language)
 
         data = {
             "contact_methods": contact_methods,
@@ -1,3 +1,28 @@
 from django.contrib import admin
+from common.exports import ExportCsvMixin
+from .models import Payment, PaymentCallback
 
-# Register your models here.
+
+@admin.register(Payment)
+class PaymentAdmin(ExportCsvMixin, admin.ModelAdmin):
+    list_display = ['order_id', 'customer_name', 'amount', 'currency', 'status', 'booking', 'created_at']
+    list_filter = ['status', 'currency', 'created_at']
+    search_fields = ['order_id', 'transaction_reference', 'customer_email', 'customer_name']
+    readonly_fields = ['created_at', 'updated_at']
+    autocomplete_fields = ['booking']
+    export_fields = (
+        'id', 'created_at', 'order_id', 'transaction_reference', 'amount', 'currency', 'status',
+        'customer_name', 'customer_email', 'booking_id',
+    )
+
+
+@admin.register(PaymentCallback)
+class PaymentCallbackAdmin(admin.ModelAdmin):
+    """Callback inbox, written by PayTabs and drained by the worker"""
+    list_display = ['tran_ref', 'received_at', 'processed_at', 'attempts', 'last_error']
+    list_filter = ['processed_at', 'received_at']
+    search_fields = ['tran_ref']
+    readonly_fields = ['tran_ref', 'payload', 'received_at', 'available_at', 'processed_at', 'attempts', 'last_error']
+
+    def has_add_permission(self, request):
+        return False
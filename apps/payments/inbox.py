@@ -0,0 +1,146 @@
+"""
+Processing of the PayTabs callback inbox (``PaymentCallback``).
+
+Workers claim pending rows in batches with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` and lease them by pushing ``available_at`` forward, so several
+workers never process the same row and a crashed worker's rows come back
+after ``CLAIM_LEASE``. Each ``tran_ref`` is verified with PayTabs once,
+which settles every callback received for it until then. The payment
+status changes of a batch are written with one UPDATE per status, and the
+bookings paid for are confirmed with one more through ``Payment.booking``.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.service.models import Booking
+from common.resilience import GatewayUnavailable
+from .models import Payment, PaymentCallback
+from . import reconciliation, verification
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'PAYMENT_CALLBACK_BATCH_SIZE', 20)
+POLL_INTERVAL = getattr(settings, 'PAYMENT_CALLBACK_POLL_INTERVAL', 1.0)
+# Longer than a batch of verifications can take, gateway retries included
+CLAIM_LEASE = timedelta(minutes=10)
+MAX_ATTEMPTS = 10
+RETRY_BACKOFF = timedelta(seconds=10)
+RETRY_BACKOFF_MAX = timedelta(hours=1)
+# Seconds the worker loop waits after a failed batch, doubled up to the max
+ERROR_BACKOFF = 1.0
+ERROR_BACKOFF_MAX = 60.0
+
+
+def claim(batch_size=BATCH_SIZE):
+    """Lease up to ``batch_size`` pending callbacks to this worker"""
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            PaymentCallback.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if rows:
+            PaymentCallback.objects.filter(pk__in=[row.pk for row in rows]).update(available_at=now + CLAIM_LEASE)
+    return rows
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    """Claim, verify and apply one batch; returns the number of rows claimed"""
+    started = timezone.now()
+    rows = claim(batch_size)
+    by_ref = {}
+    for row in rows:
+        by_ref.setdefault(row.tran_ref, []).append(row)
+
+    verified, failed = {}, {}
+    for tran_ref in by_ref:
+        try:
+            # A stored pending status is what this callback may be updating
+            result = verification.verify(tran_ref, reuse_pending=False)
+        except GatewayUnavailable as error:
+            # Nothing else in the batch would get through either; hand the
+            # rest back without counting an attempt against them
+            waiting = [row.pk for ref in by_ref if ref not in verified and ref not in failed for row in by_ref[ref]]
+            PaymentCallback.objects.filter(pk__in=waiting).update(
+                available_at=timezone.now() + timedelta(seconds=error.retry_after)
+            )
+            logger.warning(f"PayTabs unavailable, {len(waiting)} callbacks deferred: {error}")
+            break
+        except Exception as error:
+            failed[tran_ref] = error
+        else:
+            verified[tran_ref] = verification.response_status(result) == "A"
+
+    if verified:
+        apply_verified(verified, started)
+    for tran_ref, error in failed.items():
+        retry_later(by_ref[tran_ref], error)
+    return len(rows)
+
+
+def apply_verified(verified, received_before):
+    """
+    Write verified outcomes ``{tran_ref: approved}`` and close every inbox
+    row for them received before ``received_before``, claimed or not.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        for approved in (True, False):
+            refs = [tran_ref for tran_ref, result in verified.items() if result is approved]
+            if refs:
+                Payment.objects.filter(transaction_reference__in=refs).update(
+                    status="SUCCESS" if approved else "FAILED", updated_at=now
+                )
+
+        payments = list(Payment.objects.filter(transaction_reference__in=verified).only(
+            'order_id', 'transaction_reference', 'customer_email', 'amount', 'currency', 'created_at', 'booking'
+        ))
+        # Payments created without a booking reference
+        reconciliation.link_bookings(payments)
+        found = set()
+        for payment in payments:
+            found.add(payment.transaction_reference)
+            logger.info(f"Payment {payment.order_id} updated to {'SUCCESS' if verified[payment.transaction_reference] else 'FAILED'}")
+
+        # A declined payment leaves its booking pending, to be paid again, and
+        # only a payment of the full booking total confirms it
+        approved = [tran_ref for tran_ref, result in verified.items() if result]
+        if approved:
+            Booking.objects.filter(
+                payments__transaction_reference__in=approved,
+                payments__amount=F('total_price'),
+                payments__currency=Payment.BOOKING_CURRENCY,
+                status='pending',
+            ).update(status='confirmed', updated_at=now)
+
+        missing = set(verified) - found
+        for tran_ref in missing:
+            logger.warning(f"Payment with tran_ref {tran_ref} not found.")
+        settled = PaymentCallback.objects.filter(processed_at__isnull=True, received_at__lt=received_before)
+        for refs, error in ((found, ''), (missing, 'Payment not found.')):
+            if refs:
+                settled.filter(tran_ref__in=refs).update(
+                    processed_at=now, attempts=F('attempts') + 1, last_error=error
+                )
+
+
+def retry_later(rows, error):
+    """Back off exponentially, giving up after ``MAX_ATTEMPTS``"""
+    now = timezone.now()
+    attempts = max(row.attempts for row in rows) + 1
+    delay = min(RETRY_BACKOFF * 2 ** (attempts - 1), RETRY_BACKOFF_MAX)
+    give_up = attempts >= MAX_ATTEMPTS
+    if give_up:
+        logger.error(f"Giving up on PayTabs callback {rows[0].tran_ref} after {attempts} attempts: {error}")
+    PaymentCallback.objects.filter(pk__in=[row.pk for row in rows]).update(
+        attempts=attempts,
+        last_error=str(error),
+        available_at=now + delay,
+        processed_at=now if give_up else None,
+    )
@@ -0,0 +1,49 @@
+import logging
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.payments import inbox
+from apps.payments.services import paytabs_service
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Verify and apply PayTabs callbacks from the inbox; runs until stopped unless --once is given'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the inbox and exit')
+        parser.add_argument('--batch-size', type=int, default=inbox.BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=inbox.POLL_INTERVAL)
+
+    def handle(self, *args, **options):
+        paytabs_service.use_worker_pool()
+        stopping = threading.Event()
+        # Dynos get SIGTERM on restarts; finish the current batch first
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stopping.set())
+
+        processed = 0
+        backoff = inbox.ERROR_BACKOFF
+        while not stopping.is_set():
+            close_old_connections()
+            try:
+                claimed = inbox.process_batch(options['batch_size'])
+            except Exception:
+                # e.g. the database going away; the batch's rows come back
+                # once their lease runs out
+                logger.exception(f'Processing PayTabs callbacks failed, retrying in {backoff:g}s')
+                stopping.wait(backoff)
+                backoff = min(backoff * 2, inbox.ERROR_BACKOFF_MAX)
+                continue
+            backoff = inbox.ERROR_BACKOFF
+            processed += claimed
+            if not claimed:
+                if options['once']:
+                    break
+                stopping.wait(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} PayTabs callbacks'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.payments import reconciliation
+
+
+class Command(BaseCommand):
+    help = 'Link payments made without a booking reference to their bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=reconciliation.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        scanned = linked = 0
+        for batch in reconciliation.unlinked_batches(options['batch_size']):
+            scanned += len(batch)
+            linked += len(reconciliation.link_bookings(batch))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Linked {linked} of {scanned} unlinked payments to their bookings')
+        )
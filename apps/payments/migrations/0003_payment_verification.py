@@ -0,0 +1,23 @@
+# Generated by Django 6.0a1 on 2026-10-18 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_payment_callback_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentVerification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tran_ref', models.CharField(max_length=100, unique=True)),
+                ('response_status', models.CharField(blank=True, max_length=10)),
+                ('result', models.JSONField(default=dict)),
+                ('verified_at', models.DateTimeField()),
+            ],
+        ),
+    ]
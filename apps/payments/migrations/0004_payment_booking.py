@@ -0,0 +1,20 @@
+# Generated by Django 6.0a1 on 2026-10-18 13:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_payment_verification'),
+        ('service', '0014_booking_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='booking',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments', to='service.booking'),
+        ),
+    ]
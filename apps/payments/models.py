@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class Payment(models.Model):
     STATUS_CHOICES = [
@@ -6,16 +7,64 @@ class Payment(models.Model):
         ("SUCCESS", "Success"),
         ("FAILED", "Failed"),
     ]
+    # Bookings are priced in this currency
+    BOOKING_CURRENCY = 'AED'
 
     order_id = models.CharField(max_length=100, db_index=True)
     transaction_reference = models.CharField(max_length=100, blank=True, null=True, unique=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    currency = models.CharField(max_length=10, default='AED')
+    currency = models.CharField(max_length=10, default=BOOKING_CURRENCY)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='INITIATED')
     customer_email = models.EmailField()
     customer_name = models.CharField(max_length=120)
+    # The booking being paid for; older payments are linked by reconciliation
+    booking = models.ForeignKey(
+        'service.Booking', related_name='payments', on_delete=models.SET_NULL, null=True, blank=True
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.order_id} - {self.status}"
+
+
+class PaymentCallback(models.Model):
+    """
+    Inbox of raw PayTabs callbacks. The callback view only stores them; the
+    ``process_payment_callbacks`` worker verifies and applies them (see
+    ``apps.payments.inbox``).
+    """
+    tran_ref = models.CharField(max_length=100, db_index=True)
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+    # Not picked up before this: pushed back while a worker holds the row,
+    # after a failed attempt, or while the gateway is unavailable
+    available_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['available_at'], name='payment_callback_pending_idx',
+                condition=models.Q(processed_at__isnull=True)
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tran_ref} - {'processed' if self.processed_at else 'pending'}"
+
+
+class PaymentVerification(models.Model):
+    """
+    Latest PayTabs verification result per transaction, shared by the
+    callback worker and the return view (see ``apps.payments.verification``).
+    """
+    tran_ref = models.CharField(max_length=100, unique=True)
+    response_status = models.CharField(max_length=10, blank=True)
+    result = models.JSONField(default=dict)
+    verified_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.tran_ref} - {self.response_status}"
@@ -0,0 +1,57 @@
+"""
+Linking payments made without a booking reference to their booking.
+
+A payment belongs to the latest booking by the same customer (normalized
+email) for the same amount, in the booking currency, made before it. Payments with no such booking
+stay unlinked.
+"""
+from apps.service.models import Booking
+from common.utils import normalize_email
+from .models import Payment
+
+BATCH_SIZE = 500
+
+
+def link_bookings(payments):
+    """Link ``payments`` (a list) to their bookings; returns the payments linked"""
+    payments = [
+        payment for payment in payments
+        if payment.booking_id is None and payment.currency == Payment.BOOKING_CURRENCY
+    ]
+    emails = {normalize_email(payment.customer_email) for payment in payments}
+    if not emails:
+        return []
+
+    candidates = {}
+    bookings = (
+        Booking.objects.filter(customer_email_normalized__in=emails)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'customer_email_normalized', 'total_price', 'created_at')
+    )
+    for booking_id, email, total_price, created_at in bookings:
+        candidates.setdefault((email, total_price), []).append((created_at, booking_id))
+
+    linked = []
+    for payment in payments:
+        key = (normalize_email(payment.customer_email), payment.amount)
+        for created_at, booking_id in candidates.get(key, ()):
+            if created_at <= payment.created_at:
+                payment.booking_id = booking_id
+                linked.append(payment)
+                break
+    Payment.objects.bulk_update(linked, ['booking'])
+    return linked
+
+
+def unlinked_batches(batch_size=BATCH_SIZE, after=0):
+    """Unlinked payments in primary key order, ``batch_size`` at a time"""
+    while True:
+        batch = list(
+            Payment.objects.filter(booking__isnull=True, pk__gt=after)
+            .order_by('pk')
+            .only('id', 'amount', 'currency', 'customer_email', 'created_at', 'booking')[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        after = batch[-1].pk
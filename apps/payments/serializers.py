@@ -1,12 +1,25 @@
 from rest_framework import serializers
+from common.utils import normalize_email
 from .models import Payment
 
 class PaymentCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
-        fields = ["order_id", "amount", "currency", "customer_email", "customer_name"]
+        fields = ["order_id", "amount", "currency", "customer_email", "customer_name", "booking"]
 
     def validate_amount(self, value):
         if value <= 0:
             raise serializers.ValidationError("Amount must be greater than zero.")
         return value
+
+    def validate(self, data):
+        booking = data.get("booking")
+        if booking is None:
+            return data
+        if booking.customer_email_normalized != normalize_email(data["customer_email"]):
+            raise serializers.ValidationError({"booking": "Booking belongs to a different customer."})
+        if data.get("currency", Payment.BOOKING_CURRENCY) != Payment.BOOKING_CURRENCY:
+            raise serializers.ValidationError({"currency": f"Bookings are paid in {Payment.BOOKING_CURRENCY}."})
+        if data["amount"] != booking.total_price:
+            raise serializers.ValidationError({"amount": f"Must equal the booking total of {booking.total_price}."})
+        return data
@@ -1,13 +1,158 @@
+import os
+import random
+import threading
+import time
+
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from common import metrics
+from common.resilience import Bulkhead, CircuitBreaker, GatewayUnavailable
+
+# Statuses worth retrying a read on; anything else is the gateway's answer
+RETRY_STATUSES = {502, 503, 504}
+RETRY_BACKOFF = 0.2
+RETRY_BACKOFF_MAX = 2.0
+
+
+class PayTabsClient:
+    """
+    HTTP client for the PayTabs API, meant to be shared by the whole process
+    (see ``get_client()``): one ``requests.Session`` keeps connections to the
+    gateway alive between calls, every call has connect and read timeouts,
+    and each call logs its latency and outcome as metrics.
+
+    Only calls marked ``idempotent`` are retried, with jittered exponential
+    backoff, on connection errors, timeouts and 502/503/504 responses.
+
+    Calls go through a circuit breaker, which fails them fast with
+    ``CircuitOpen`` while the gateway keeps failing, and the ``bulkhead``
+    pool of ``max_concurrency`` calls across all workers, raising
+    ``BulkheadFull`` when no slot frees up within ``bulkhead_wait`` seconds.
+    """
+
+    def __init__(self, base_url, server_key, connect_timeout=3.05, read_timeout=15,
+                 pool_size=10, retries=2, max_concurrency=4, failure_threshold=5,
+                 reset_timeout=30, bulkhead='paytabs', bulkhead_cache='default', bulkhead_wait=0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.breaker = CircuitBreaker('paytabs', failure_threshold, reset_timeout)
+        # A slot is held for at most the longest possible call
+        lease = (connect_timeout + read_timeout) * (retries + 1) + RETRY_BACKOFF_MAX * retries
+        self.bulkhead = Bulkhead(bulkhead, max_concurrency, int(lease) + 1, bulkhead_cache, bulkhead_wait)
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"{server_key}",
+            "Content-Type": "application/json",
+        })
+        # Retries are ours, so that only idempotent calls get them
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def post(self, path, payload, idempotent=False):
+        """POST ``payload`` to ``path`` and return the decoded JSON response"""
+        name = f"paytabs.{path.strip('/').replace('/', '_')}"
+        call = {'outcome': 'error', 'attempts': 0}
+        started = time.perf_counter()
+        try:
+            self.breaker.check()
+            with self.bulkhead.hold():
+                data = self._send(path, payload, 1 + (self.retries if idempotent else 0), call)
+        except GatewayUnavailable as error:
+            call['outcome'] = error.reason
+            raise
+        except requests.RequestException as error:
+            # A 4xx is the gateway answering; anything else counts against it
+            status_code = getattr(error.response, 'status_code', None)
+            if status_code is not None and status_code < 500:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise
+        else:
+            self.breaker.record_success()
+            return data
+        finally:
+            metrics.emit(
+                measure={name: (time.perf_counter() - started) * 1000},
+                count={f"{name}.{call['outcome']}": 1},
+                sample={f'{name}.attempts': call['attempts']},
+            )
+
+    def _send(self, path, payload, attempts, call):
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            call['attempts'] = attempt + 1
+            try:
+                response = self.session.post(f"{self.base_url}/{path}", json=payload, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                call['outcome'] = 'timeout' if isinstance(error, requests.Timeout) else 'connection_error'
+                if last_attempt:
+                    raise
+            else:
+                call['outcome'] = f'http_{response.status_code}'
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    response.raise_for_status()  # raises on 4xx/5xx
+                    data = response.json()
+                    call['outcome'] = 'ok'
+                    return data
+            # Full jitter keeps retrying workers from hitting the gateway in step
+            time.sleep(random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** attempt)))
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+# Whether this process's calls count against the callback worker's bulkhead
+_worker_pool = False
+
+
+def use_worker_pool():
+    """
+    Count this process's gateway calls against the callback worker's own
+    bulkhead, so verifying callbacks never takes the web dynos' slots.
+    """
+    global _client, _worker_pool
+    with _client_lock:
+        _worker_pool = True
+        _client = None
+
+
+def get_client():
+    """The process-wide ``PayTabsClient``, built from settings on first use"""
+    global _client, _client_pid
+
+    # A client inherited across a fork would share its sockets with the parent
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = PayTabsClient(
+                    settings.PAYTABS_BASE_URL,
+                    settings.PAYTABS_SERVER_KEY,
+                    connect_timeout=settings.PAYTABS_CONNECT_TIMEOUT,
+                    read_timeout=settings.PAYTABS_READ_TIMEOUT,
+                    pool_size=settings.PAYTABS_POOL_SIZE,
+                    retries=settings.PAYTABS_QUERY_RETRIES,
+                    max_concurrency=(
+                        settings.PAYTABS_WORKER_MAX_CONCURRENCY if _worker_pool
+                        else settings.PAYTABS_MAX_CONCURRENCY
+                    ),
+                    failure_threshold=settings.PAYTABS_BREAKER_FAILURES,
+                    reset_timeout=settings.PAYTABS_BREAKER_RESET_TIMEOUT,
+                    bulkhead='paytabs_worker' if _worker_pool else 'paytabs',
+                    bulkhead_cache=settings.PAYTABS_SHARED_CACHE,
+                    bulkhead_wait=settings.PAYTABS_BULKHEAD_WAIT,
+                )
+                _client_pid = os.getpid()
+    return _client
+
 
 class PayTabsService:
-    def __init__(self):
-        self.api_url = f"{settings.PAYTABS_BASE_URL}/payment/request"
-        self.headers = {
-            "Authorization": f"{settings.PAYTABS_SERVER_KEY}",
-            "Content-Type": "application/json"
-        }
+    def __init__(self, client=None):
+        self.client = client or get_client()
 
     def create_payment_session(self, payment):
         """Create a PayTabs payment session."""
@@ -34,14 +179,10 @@ class PayTabsService:
             },
         }
 
-        response = requests.post(self.api_url, json=payload, headers=self.headers, timeout=15)
-        response.raise_for_status()  # raises on 4xx/5xx
-        return response.json()
+        # Not retried: a repeat could open a second session for the same cart
+        return self.client.post("payment/request", payload)
 
     def verify_payment(self, tran_ref):
         """Optional: verify a transaction using PayTabs API."""
-        url = f"{settings.PAYTABS_BASE_URL}/payment/query"
         payload = {"tran_ref": tran_ref, "profile_id": settings.PAYTABS_PROFILE_ID}
-        response = requests.post(url, json=payload, headers=self.headers)
-        response.raise_for_status()
-        return response.json()
+        return self.client.post("payment/query", payload, idempotent=True)
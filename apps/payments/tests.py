@@ -1,3 +1,262 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.service.models import Booking, Package, Service
+from common.resilience import GatewayUnavailable
+from . import inbox, reconciliation
+from .models import Payment, PaymentCallback, PaymentVerification
+from .serializers import PaymentCreateSerializer
+
+APPROVED = {'payment_result': {'response_status': 'A'}}
+
+
+def create_payment(tran_ref, **fields):
+    return Payment.objects.create(**{
+        'order_id': f'order-{tran_ref}', 'transaction_reference': tran_ref, 'amount': '150.00',
+        'customer_email': 'sara@example.com', 'customer_name': 'Sara', **fields,
+    })
+
+
+def create_package():
+    service = Service.objects.create(name='Home Cleaning', description='Weekly', service_type='home_cleaning')
+    return Package.objects.create(
+        service=service, name='Studio', square_feet='400', duration='2 hours', package_type='studio', price='150.00'
+    )
+
+
+def create_booking(package, created_at=None, email='sara@example.com', total_price='150.00'):
+    booking = Booking.objects.create(
+        service=package.service, package=package, customer_name='Sara', customer_email=email,
+        customer_phone='0501234567', address='Dubai Marina', booking_date=timezone.now() + timedelta(days=2),
+        total_price=total_price,
+    )
+    if created_at:
+        Booking.objects.filter(pk=booking.pk).update(created_at=created_at)
+    return booking
+
+
+class CallbackInboxTests(TestCase):
+    def setUp(self):
+        verify = mock.patch.object(inbox.verification, 'verify', return_value=APPROVED)
+        self.verify = verify.start()
+        self.addCleanup(verify.stop)
+
+    def assertAbout(self, moment, expected):
+        self.assertAlmostEqual(moment, expected, delta=timedelta(seconds=5))
+
+    def test_callbacks_are_verified_once_per_tran_ref(self):
+        for tran_ref in ('T1', 'T2'):
+            create_payment(tran_ref)
+        for tran_ref in ('T1', 'T1', 'T1', 'T2'):
+            PaymentCallback.objects.create(tran_ref=tran_ref)
+
+        self.assertEqual(inbox.process_batch(), 4)
+
+        self.assertEqual(sorted(call.args[0] for call in self.verify.call_args_list), ['T1', 'T2'])
+        self.assertEqual(set(Payment.objects.values_list('status', flat=True)), {'SUCCESS'})
+        self.assertFalse(PaymentCallback.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(set(PaymentCallback.objects.values_list('attempts', 'last_error')), {(1, '')})
+
+    def test_gateway_unavailable_defers_the_batch_without_an_attempt(self):
+        create_payment('T1')
+        PaymentCallback.objects.create(tran_ref='T1')
+        self.verify.side_effect = GatewayUnavailable('paytabs', 30)
+
+        with self.assertLogs(inbox.logger, 'WARNING'):
+            inbox.process_batch()
+
+        callback = PaymentCallback.objects.get()
+        self.assertIsNone(callback.processed_at)
+        self.assertEqual(callback.attempts, 0)
+        # Not held for the claim lease, but until the gateway may be back
+        self.assertAbout(callback.available_at, timezone.now() + timedelta(seconds=30))
+        self.assertEqual(Payment.objects.get().status, 'INITIATED')
+
+    def test_failures_back_off_exponentially_until_given_up(self):
+        PaymentCallback.objects.create(tran_ref='T1')
+        self.verify.side_effect = ValueError('Unexpected response')
+
+        inbox.process_batch()
+        callback = PaymentCallback.objects.get()
+        self.assertEqual((callback.attempts, callback.last_error), (1, 'Unexpected response'))
+        self.assertAbout(callback.available_at, timezone.now() + inbox.RETRY_BACKOFF)
+
+        for attempts in range(2, inbox.MAX_ATTEMPTS):
+            inbox.retry_later([callback], ValueError('Unexpected response'))
+            callback.refresh_from_db()
+            self.assertEqual(callback.attempts, attempts)
+            self.assertIsNone(callback.processed_at)
+            self.assertAbout(
+                callback.available_at,
+                timezone.now() + min(inbox.RETRY_BACKOFF * 2 ** (attempts - 1), inbox.RETRY_BACKOFF_MAX),
+            )
+
+        with self.assertLogs(inbox.logger, 'ERROR'):
+            inbox.retry_later([callback], ValueError('Unexpected response'))
+        callback.refresh_from_db()
+        self.assertEqual(callback.attempts, inbox.MAX_ATTEMPTS)
+        self.assertIsNotNone(callback.processed_at)
+
+    def test_callback_without_a_payment_is_closed(self):
+        PaymentCallback.objects.create(tran_ref='T404')
+
+        with self.assertLogs(inbox.logger, 'WARNING'):
+            inbox.process_batch()
+
+        callback = PaymentCallback.objects.get()
+        self.assertIsNotNone(callback.processed_at)
+        self.assertEqual(callback.last_error, 'Payment not found.')
+
+
+@override_settings(PAYTABS_SERVER_KEY='server-key')
+class CallbackViewTests(TestCase):
+    def post(self, body, content_type, outcome):
+        body = body.encode()
+        signature = hmac.new(b'server-key', body, hashlib.sha256).hexdigest()
+        with self.assertLogs('metrics') as metrics:
+            response = self.client.post(
+                '/api/v1/payments/callback/', body, content_type=content_type, HTTP_SIGNATURE=signature
+            )
+        self.assertEqual(metrics.output, [f'INFO:metrics:count#paytabs.callback.{outcome}=1'])
+        return response
+
+    def test_signed_terminal_callback_is_recorded(self):
+        payload = {'tran_ref': 'T1', **APPROVED}
+
+        response = self.post(json.dumps(payload), 'application/json', 'signed')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PaymentCallback.objects.get().payload, payload)
+        self.assertEqual(PaymentVerification.objects.get().response_status, 'A')
+
+    def test_form_encoded_callback_is_stored_as_inconclusive(self):
+        body = urlencode({'tran_ref': 'T1', 'payment_result': "{'response_status': 'A'}"})
+
+        response = self.post(body, 'application/x-www-form-urlencoded', 'signed_inconclusive')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PaymentCallback.objects.get().tran_ref, 'T1')
+        self.assertFalse(PaymentVerification.objects.exists())
+
+    def test_callback_is_stored_when_recording_it_fails(self):
+        with mock.patch.object(PaymentVerification.objects, 'update_or_create', side_effect=RuntimeError), \
+                self.assertLogs('apps.payments.views', 'ERROR'):
+            response = self.post(json.dumps({'tran_ref': 'T1', **APPROVED}), 'application/json', 'signed_inconclusive')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PaymentCallback.objects.get().tran_ref, 'T1')
+
+
+class BookingPaymentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.package = create_package()
+
+    def setUp(self):
+        verify = mock.patch.object(inbox.verification, 'verify', return_value=APPROVED)
+        verify.start()
+        self.addCleanup(verify.stop)
+
+    def create_booking(self, **fields):
+        return create_booking(self.package, **fields)
+
+    def approve(self, payment):
+        PaymentCallback.objects.create(tran_ref=payment.transaction_reference)
+        inbox.process_batch()
+
+    def test_full_payment_confirms_the_booking(self):
+        booking = self.create_booking()
+
+        self.approve(create_payment('T1', booking=booking))
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'confirmed')
+
+    def test_underpaid_or_foreign_currency_payment_leaves_the_booking_pending(self):
+        for tran_ref, amount, currency in (('T1', '100.00', 'AED'), ('T2', '150.00', 'USD')):
+            with self.subTest(amount=amount, currency=currency):
+                booking = self.create_booking()
+
+                self.approve(create_payment(tran_ref, booking=booking, amount=amount, currency=currency))
+
+                booking.refresh_from_db()
+                self.assertEqual(booking.status, 'pending')
+                self.assertEqual(Payment.objects.get(transaction_reference=tran_ref).status, 'SUCCESS')
+
+    def test_payment_without_a_booking_is_linked_and_confirms_it(self):
+        booking = self.create_booking(created_at=timezone.now() - timedelta(hours=1))
+
+        self.approve(create_payment('T1', customer_email=' Sara@Example.com '))
+
+        self.assertEqual(Payment.objects.get().booking, booking)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'confirmed')
+
+    def test_booking_payments_must_match_its_total_and_currency(self):
+        booking = self.create_booking()
+        data = {
+            'order_id': 'order-1', 'amount': '150.00', 'currency': 'AED', 'customer_email': 'sara@example.com',
+            'customer_name': 'Sara', 'booking': booking.pk,
+        }
+        self.assertTrue(PaymentCreateSerializer(data=data).is_valid())
+
+        for field, value in (('amount', '100.00'), ('currency', 'USD')):
+            with self.subTest(field=field):
+                serializer = PaymentCreateSerializer(data={**data, field: value})
+                self.assertFalse(serializer.is_valid())
+                self.assertEqual(list(serializer.errors), [field])
+
+
+class ReconciliationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.package = create_package()
+
+    def create_booking(self, created_at, **fields):
+        return create_booking(self.package, created_at, **fields)
+
+    def create_payment(self, tran_ref, created_at, **fields):
+        payment = create_payment(tran_ref, **fields)
+        Payment.objects.filter(pk=payment.pk).update(created_at=created_at)
+        payment.refresh_from_db()
+        return payment
+
+    def test_payment_is_linked_to_the_latest_earlier_booking_for_its_amount(self):
+        now = timezone.now()
+        self.create_booking(now - timedelta(hours=3))
+        latest = self.create_booking(now - timedelta(hours=2))
+        self.create_booking(now - timedelta(hours=1), total_price='200.00')
+        self.create_booking(now - timedelta(hours=1), email='other@example.com')
+        self.create_booking(now + timedelta(hours=1))
+
+        payment = self.create_payment('T1', now, customer_email='SARA@example.com')
+        foreign = self.create_payment('T2', now, currency='USD')
+
+        self.assertEqual(reconciliation.link_bookings([payment, foreign]), [payment])
+        self.assertEqual(Payment.objects.get(pk=payment.pk).booking, latest)
+        self.assertIsNone(Payment.objects.get(pk=foreign.pk).booking)
+
+    def test_command_links_unlinked_payments_in_batches(self):
+        now = timezone.now()
+        for index in range(5):
+            email = f'customer{index}@example.com'
+            self.create_booking(now - timedelta(hours=1), email=email)
+            self.create_payment(f'T{index}', now, customer_email=email)
+        self.create_payment('T9', now, customer_email='nobody@example.com')
+        out = StringIO()
+
+        with mock.patch.object(reconciliation, 'link_bookings', wraps=reconciliation.link_bookings) as link:
+            call_command('reconcile_payment_bookings', batch_size=2, stdout=out)
+
+        self.assertEqual([len(call.args[0]) for call in link.call_args_list], [2, 2, 2])
+        self.assertIn('Linked 5 of 6 unlinked payments', out.getvalue())
+        self.assertEqual(Payment.objects.filter(booking__isnull=True).get().transaction_reference, 'T9')
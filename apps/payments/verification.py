@@ -0,0 +1,121 @@
+"""
+Verification of PayTabs transactions, shared by the callback worker and
+the return view.
+
+Results are stored per ``tran_ref`` in ``PaymentVerification``. Once PayTabs
+reports a terminal status it is served from the store from then on. The
+return view also reuses a pending one for ``PENDING_TTL`` seconds, which
+absorbs browser refreshes; the callback worker never does, since a
+follow-up callback is what reports the pending payment settling. Concurrent verifications of one reference,
+from any worker, are coalesced behind a ``cache.add`` lock so only one
+request reaches the gateway.
+
+Callbacks signed with the server key and carrying a terminal status are
+stored as they come (``record_callback``), so they need no gateway call.
+"""
+import hashlib
+import hmac
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import PaymentVerification
+from .services.paytabs_service import PayTabsService
+
+# Authorized, declined, error and voided; hold and pending may still change
+TERMINAL_STATUSES = {'A', 'D', 'E', 'V'}
+PENDING_TTL = timedelta(seconds=5)
+# Outlives the slowest verification, retries included
+LOCK_TIMEOUT = 60
+# How long a concurrent verification waits for the first before going itself
+WAIT_TIMEOUT = 10
+POLL_INTERVAL = 0.1
+
+
+def response_status(result):
+    """``payment_result.response_status`` of a result, '' when missing or malformed"""
+    payment_result = result.get("payment_result") if isinstance(result, dict) else None
+    if not isinstance(payment_result, dict):
+        # e.g. a form-encoded callback, whose nested objects arrive as strings
+        return ""
+    status = payment_result.get("response_status", "")
+    return status if isinstance(status, str) else ""
+
+
+def signature_valid(body, signature):
+    """Whether ``signature`` is the HMAC-SHA256 of the raw ``body`` with the server key"""
+    if not signature or not settings.PAYTABS_SERVER_KEY:
+        return False
+    expected = hmac.new(settings.PAYTABS_SERVER_KEY.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected.encode(), signature.strip().lower().encode())
+
+
+def record_callback(tran_ref, payload):
+    """
+    Store the result of a callback whose signature was checked, when it is
+    conclusive on its own. Returns False when it has to be verified with
+    PayTabs instead.
+    """
+    if payload.get("tran_ref") != tran_ref or response_status(payload) not in TERMINAL_STATUSES:
+        return False
+    _store(tran_ref, payload)
+    return True
+
+
+def _store(tran_ref, result):
+    PaymentVerification.objects.update_or_create(tran_ref=tran_ref, defaults={
+        'response_status': response_status(result),
+        'result': result,
+        'verified_at': timezone.now(),
+    })
+
+
+def stored_result(tran_ref, reuse_pending=True):
+    """
+    The stored result for ``tran_ref`` if it can still be used, else None.
+    Pending results are only used with ``reuse_pending``, within ``PENDING_TTL``.
+    """
+    stored = PaymentVerification.objects.filter(tran_ref=tran_ref).first()
+    if stored is None:
+        return None
+    if stored.response_status in TERMINAL_STATUSES:
+        return stored.result
+    if reuse_pending and stored.verified_at > timezone.now() - PENDING_TTL:
+        return stored.result
+    return None
+
+
+def verify(tran_ref, reuse_pending=True):
+    """
+    PayTabs' verification result for ``tran_ref``, from the store when
+    possible; see ``stored_result()`` for ``reuse_pending``.
+    """
+    result = stored_result(tran_ref, reuse_pending)
+    if result is not None:
+        return result
+
+    cache = caches[settings.PAYTABS_SHARED_CACHE]
+    lock_key = f'paytabs:verify:{tran_ref}'
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    while not locked and time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        result = stored_result(tran_ref, reuse_pending)
+        if result is not None:
+            return result
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+
+    try:
+        # The verification holding the lock before us may have just finished
+        result = stored_result(tran_ref, reuse_pending)
+        if result is not None:
+            return result
+        result = PayTabsService().verify_payment(tran_ref)
+        _store(tran_ref, result)
+        return result
+    finally:
+        if locked:
+            cache.delete(lock_key)
@@ -3,17 +3,30 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from .models import Payment
+from .models import PaymentCallback
 from .serializers import PaymentCreateSerializer
 from .services.paytabs_service import PayTabsService
+from . import verification
 import logging
 from django.http import HttpResponseRedirect
-from apps.service.models import Booking
+from common import metrics
+from common.idempotency import idempotent
+from common.resilience import GatewayUnavailable
 logger = logging.getLogger(__name__)
 
 
+def gateway_unavailable_response(error):
+    """503 telling the client (or PayTabs, for callbacks) when to try again"""
+    return Response(
+        {"error": "Payment gateway temporarily unavailable."},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
 class CreatePaymentView(APIView):
 
+    @idempotent
     def post(self, request):
         serializer = PaymentCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -32,6 +45,11 @@ class CreatePaymentView(APIView):
                 "transaction_reference": tran_ref,
                 "status": "INITIATED"
             })
+        except GatewayUnavailable as e:
+            logger.warning(f"PayTabs unavailable: {e}")
+            payment.status = "FAILED"
+            payment.save()
+            return gateway_unavailable_response(e)
         except Exception as e:
             logger.error(f"PayTabs Error: {e}")
             payment.status = "FAILED"
@@ -45,6 +63,8 @@ class PayTabsCallbackView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def post(self, request):
+        # The signature covers the raw body, which request.data consumes
+        body = request.body
         data = request.data
         logger.info(f"PayTabs callback received: {data}")
 
@@ -52,29 +72,29 @@ class PayTabsCallbackView(APIView):
         if not tran_ref:
             return Response({"error": "Missing transaction reference."}, status=status.HTTP_400_BAD_REQUEST)
 
-        paytabs = PayTabsService()
-        result = paytabs.verify_payment(tran_ref)
-
-        try:
-            payment = Payment.objects.get(transaction_reference=tran_ref)
-        except Payment.DoesNotExist:
-            logger.warning(f"Payment with tran_ref {tran_ref} not found.")
-            return Response({"error": "Payment not found."}, status=status.HTTP_200_OK)
-
-        status_code = result.get("payment_result", {}).get("response_status")
-        payment.status = "SUCCESS" if status_code == "A" else "FAILED"
-        payment.save()
-
-        try:
-            booking = Booking.objects.get(customer_email=payment.customer_email)
-            booking.status = "SUCCESS" if status_code == "A" else "FAILED"
-            booking.save()
-        except Exception as ex:
-            logger.warning(f"Booking Does not exist {ex}")
-            pass
+        payload = data.dict() if hasattr(data, "dict") else data
+        # Stored and acknowledged at once, before anything can fail; the
+        # process_payment_callbacks worker verifies it and updates the
+        # payment and booking
+        PaymentCallback.objects.create(tran_ref=tran_ref, payload=payload)
+
+        signature = request.headers.get("Signature")
+        if verification.signature_valid(body, signature):
+            # Trusted as sent; only an inconclusive one still needs payment/query
+            try:
+                recorded = verification.record_callback(tran_ref, payload)
+            except Exception:
+                logger.exception(f"Recording the PayTabs callback for {tran_ref} failed, verifying with PayTabs")
+                recorded = False
+            outcome = "signed" if recorded else "signed_inconclusive"
+        elif signature:
+            logger.warning(f"PayTabs callback for {tran_ref} has an invalid signature, verifying with PayTabs")
+            outcome = "bad_signature"
+        else:
+            outcome = "unsigned"
+        metrics.emit(count={f"paytabs.callback.{outcome}": 1})
 
-        logger.info(f"Payment {payment.order_id} updated to {payment.status}")
-        return Response({"message": "Callback processed successfully."}, status=status.HTTP_200_OK)
+        return Response({"message": "Callback received."}, status=status.HTTP_200_OK)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -97,11 +117,14 @@ class PayTabsReturnView(APIView):
         if not tran_ref:
             return Response({"error": "Missing tran_ref"}, status=400)
 
-        paytabs = PayTabsService()
-        result = paytabs.verify_payment(tran_ref)
+        try:
+            result = verification.verify(tran_ref)
+        except GatewayUnavailable as e:
+            logger.warning(f"PayTabs unavailable, return for {tran_ref} not verified: {e}")
+            return gateway_unavailable_response(e)
         logger.info(f"PayTabs return verification for {tran_ref}: {result}")
 
-        payment_status = result.get("payment_result", {}).get("response_status", "")
+        payment_status = verification.response_status(result)
         frontend_base_url = "https://bright-scope.vercel.app"
 
         if payment_status in ["A", "success", "APPROVED"]:
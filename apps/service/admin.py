@@ -1,6 +1,20 @@
+import re
+
+from django import forms
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
-from .models import Service, ServiceFeature, Package, Addon, AddonCategory, Booking, ServiceContent, ServiceRating
+from common.exports import ExportCsvMixin
+from common.pagination import EstimatedCountPaginator
+from . import capacity
+from .models import (
+    Service, ServiceFeature, Package, Addon, AddonCategory, Booking, ServiceContent, ServiceRating,
+    ServiceCapacity, CapacitySlot
+)
+
+# Admin search terms looked up as phone numbers rather than names: digits and
+# separators only, with enough digits not to be a year or a booking id
+PHONE_SEARCH = re.compile(r'\+?[\d\s()-]+')
+PHONE_SEARCH_MIN_DIGITS = 7
 
 
 class PackageInline(admin.TabularInline):
@@ -43,6 +57,14 @@ class ServiceRatingInline(admin.TabularInline):
     verbose_name_plural = _("Ratings")
 
 
+class ServiceCapacityInline(admin.TabularInline):
+    model = ServiceCapacity
+    extra = 0
+    fields = ['package', 'slot_minutes', 'capacity']
+    verbose_name = _("Capacity")
+    verbose_name_plural = _("Capacity")
+
+
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
     list_display = ['name', 'name_ar', 'service_type', 'is_active', 'created_at']
@@ -50,7 +72,10 @@ class ServiceAdmin(admin.ModelAdmin):
     search_fields = ['name', 'name_ar', 'description', 'description_ar']
     list_editable = ['is_active']
     readonly_fields = ['created_at', 'updated_at']
-    inlines = [ServiceFeatureInline, ServiceContentInline, ServiceRatingInline, PackageInline, AddonInline]
+    inlines = [
+        ServiceFeatureInline, ServiceContentInline, ServiceRatingInline, PackageInline, AddonInline,
+        ServiceCapacityInline,
+    ]
 
     fieldsets = (
         (_('Basic Information'), {
@@ -267,14 +292,56 @@ class AddonAdmin(admin.ModelAdmin):
     )
 
 
+class BookingAdminForm(forms.ModelForm):
+    """Rejects a booking date whose slot is full before Booking.save() would reserve it"""
+
+    def clean(self):
+        cleaned_data = super().clean()
+        booking = self.instance
+        if not self.has_changed():
+            return cleaned_data
+        # The changelist form only edits the status; the rest is the booking's
+        values = {
+            name: cleaned_data.get(name) if name in self.fields else getattr(booking, name)
+            for name in ('service', 'package', 'booking_date', 'status')
+        }
+        if None in values.values() or values['status'] == 'cancelled':
+            return cleaned_data
+        keeps_slot = not booking._state.adding and booking.status != 'cancelled' and (
+            (values['service'].pk, values['package'].pk, values['booking_date'])
+            == (booking.service_id, booking.package_id, booking.booking_date)
+        )
+        if not keeps_slot and not capacity.has_room(
+            values['service'], values['package'], values['booking_date'], booking.capacity_slot_id
+        ):
+            self.add_error('booking_date' if 'booking_date' in self.fields else None,
+                           _('This time slot is fully booked.'))
+        return cleaned_data
+
+
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
-    list_display = ['customer_name', 'service', 'package', 'total_price', 'status', 'booking_date', 'created_at']
+class BookingAdmin(ExportCsvMixin, admin.ModelAdmin):
+    form = BookingAdminForm
+    # Snapshot columns, so rows render without touching the catalog tables
+    list_display = [
+        'customer_name', 'service_name', 'package_name', 'total_price', 'status', 'booking_date', 'created_at'
+    ]
     list_filter = ['status', 'service', 'booking_date', 'created_at']
-    search_fields = ['customer_name', 'customer_email', 'customer_phone', 'service__name']
+    search_fields = ['customer_name', 'customer_email', 'customer_phone', 'service_name']
     readonly_fields = ['created_at', 'updated_at']
     list_editable = ['status']
-    filter_horizontal = ['addons']
+    autocomplete_fields = ['service', 'package', 'addons']
+    date_hierarchy = 'booking_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    export_fields = (
+        'id', 'created_at', 'status', 'customer_name', 'customer_email', 'customer_phone', 'address',
+        'service_name', 'service_type', 'package_name', 'package_price', 'addon_lines', 'total_price',
+        'booking_date', 'special_requests',
+    )
+    export_formatters = {
+        'addon_lines': lambda lines: '; '.join(line['name'] for line in lines),
+    }
 
     fieldsets = (
         (_('Customer Information'), {
@@ -305,3 +372,32 @@ class BookingAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+
+    def get_changelist_form(self, request, **kwargs):
+        return super().get_changelist_form(request, form=BookingAdminForm, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Emails and phone numbers go to the indexed normalized columns; any
+        # other term, e.g. part of a name or an email, to search_fields
+        term = search_term.strip()
+        if '@' in term:
+            return queryset.search_customer(email=term, match='prefix'), False
+        if PHONE_SEARCH.fullmatch(term) and len(re.sub(r'\D', '', term)) >= PHONE_SEARCH_MIN_DIGITS:
+            return queryset.search_customer(phone=term, match='prefix'), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(CapacitySlot)
+class CapacitySlotAdmin(admin.ModelAdmin):
+    """Reservation counters, maintained by bookings only"""
+    list_display = ['starts_at', 'service_capacity', 'used', 'capacity']
+    list_filter = ['service_capacity__service']
+    list_select_related = ['service_capacity__service', 'service_capacity__package']
+    date_hierarchy = 'starts_at'
+    readonly_fields = ['service_capacity', 'starts_at', 'capacity', 'used']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
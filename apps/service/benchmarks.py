@@ -0,0 +1,106 @@
+"""
+Helpers for the ``benchmark_*`` management commands.
+
+``generated_catalog()`` fills the catalog tables with a large generated
+catalog inside a transaction that is always rolled back, so the commands
+can run against any database, and ``best_of()`` times a callable the way
+``timeit`` does.
+"""
+import timeit
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+from rest_framework import serializers
+
+from common.localization import LocalizedField
+from .models import (
+    Service, ServiceFeature, ServiceContent, ServiceRating, Package, Addon, AddonCategory
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def generated_catalog(services=30, addons=40, rows=8):
+    """
+    Yield the pks of ``services`` generated services, each with ``addons``
+    addons and ``rows`` features, contents, ratings and packages, half of
+    every relation translated. Nothing is left behind in the database.
+    """
+    try:
+        with transaction.atomic():
+            category = AddonCategory.objects.create(name='Extras', name_ar='إضافات')
+            created = Service.objects.bulk_create(
+                Service(
+                    name=f'Service {index}', name_ar=f'خدمة {index}', description='Description ' * 20,
+                    description_ar='وصف ' * 20, hero_title='Hero', service_type='deep_cleaning',
+                    start_price=100 + index,
+                )
+                for index in range(services)
+            )
+            for service in created:
+                ServiceFeature.objects.bulk_create(_translated(ServiceFeature, service, rows))
+                ServiceContent.objects.bulk_create(_translated(ServiceContent, service, rows))
+                ServiceRating.objects.bulk_create(_translated(ServiceRating, service, rows, description='Good'))
+                Package.objects.bulk_create(_translated(
+                    Package, service, rows, square_feet='800', duration='3 hours',
+                    package_type='villa', price=Decimal('250.50'),
+                ))
+                Addon.objects.bulk_create(_translated(
+                    Addon, service, addons, category=category, price=Decimal('40.00')
+                ))
+            yield [service.pk for service in created]
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def _translated(model, service, count, **fields):
+    return [
+        model(service=service, name=f'{model.__name__} {order}', name_ar='عربي' if order % 2 else '',
+              order=order, **fields)
+        for order in range(count)
+    ]
+
+
+def best_of(function, number, repeat=5):
+    """Best average run time of ``function`` in milliseconds"""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1000
+
+
+def _request_language(request):
+    # The per-serializer _get_language() helper LocalizedField replaced
+    if request:
+        lang = request.query_params.get('lang', '').lower()
+        if lang in ['ar', 'en']:
+            return lang
+        accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
+        if 'ar' in accept_language.lower():
+            return 'ar'
+    return 'en'
+
+
+def _per_field_getter(name):
+    def getter(self, obj):
+        language = _request_language(self.context.get('request'))
+        value_ar = getattr(obj, f'{name}_ar')
+        return value_ar if language == 'ar' and value_ar else getattr(obj, name)
+    return getter
+
+
+def per_field_language(serializer_class):
+    """
+    ``serializer_class`` as it was before ``LocalizedField``: every translated
+    field is a ``SerializerMethodField`` resolving the language for every row.
+    """
+    attrs = {}
+    for name, field in serializer_class._declared_fields.items():
+        if isinstance(field, LocalizedField):
+            attrs[name] = serializers.SerializerMethodField()
+            attrs[f'get_{name}'] = _per_field_getter(name)
+        elif isinstance(field, serializers.ListSerializer):
+            attrs[name] = per_field_language(type(field.child))(many=True, read_only=True)
+    return type(f'PerField{serializer_class.__name__}', (serializer_class,), attrs)
@@ -0,0 +1,156 @@
+"""
+Time-slot capacity of bookings.
+
+Each ``ServiceCapacity`` rule splits time into fixed slots aligned to UTC
+midnight. Reservations are counted per slot in ``CapacitySlot`` rows and
+taken with a conditional ``UPDATE ... SET used = used + 1 WHERE used <
+capacity``, so concurrent bookings can never oversubscribe a slot whatever
+the isolation level. Availability is answered from those counters alone,
+without looking at bookings, and cached per ``ServiceCapacity.version``,
+which every reservation change bumps before touching a counter, so the rule
+row is always locked first.
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone as django_timezone
+from rest_framework import serializers
+
+from .models import ServiceCapacity, CapacitySlot
+
+# Calendars are keyed by rule version, the timeout only bounds memory use
+CALENDAR_CACHE_TIMEOUT = getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', 300)
+
+_datetime = serializers.DateTimeField()
+
+
+class SlotUnavailable(Exception):
+    """The requested slot has no capacity left"""
+
+
+def capacity_for(service, package=None):
+    """The rule applying to a booking of ``package``, or None when bookings are unlimited"""
+    rules = ServiceCapacity.objects.filter(service=service)
+    if package is not None:
+        rules = rules.filter(Q(package=package) | Q(package__isnull=True))
+    else:
+        rules = rules.filter(package__isnull=True)
+    # Package rules sort before the service-wide one (NULL last)
+    return rules.order_by(F('package').asc(nulls_last=True)).first()
+
+
+def slot_start(moment, slot_minutes):
+    """Start of the slot ``moment`` falls in"""
+    seconds = slot_minutes * 60
+    timestamp = int(moment.timestamp())
+    return datetime.fromtimestamp(timestamp - timestamp % seconds, tz=timezone.utc)
+
+
+def reserve(rule, moment):
+    """
+    Take one reservation in the slot of ``moment`` and return its counter row
+    id. Raises ``SlotUnavailable`` when the slot is full.
+    """
+    starts_at = slot_start(moment, rule.slot_minutes)
+    slots = CapacitySlot.objects.filter(service_capacity=rule, starts_at=starts_at)
+    # Lock the rule row before any counter, like CapacitySlot.release(), so a
+    # booking moving between slots can't deadlock with one reserving them
+    _touch(rule)
+
+    for _attempt in range(2):
+        if slots.filter(used__lt=F('capacity')).update(used=F('used') + 1):
+            return slots.values_list('pk', flat=True).get()
+        if slots.exists() or rule.capacity < 1:
+            raise SlotUnavailable(starts_at)
+        try:
+            with transaction.atomic():
+                slot = CapacitySlot.objects.create(
+                    service_capacity=rule, starts_at=starts_at, capacity=rule.capacity, used=1
+                )
+        except IntegrityError:
+            # Another booking created the counter first; take the UPDATE path
+            continue
+        return slot.pk
+    raise SlotUnavailable(starts_at)
+
+
+def reserve_for(booking):
+    """
+    Take the reservation ``booking`` needs at its ``booking_date`` and return
+    the counter row id, or None when its service is unlimited. Raises
+    ``SlotUnavailable`` when the slot is full.
+    """
+    rule = capacity_for(booking.service_id, booking.package_id)
+    return reserve(rule, booking.booking_date) if rule else None
+
+
+def has_room(service, package, moment, held_slot=None):
+    """
+    Whether a booking of ``package`` at ``moment`` would get a reservation
+    right now, for form validation; only ``reserve()`` actually holds one.
+    ``held_slot`` is the counter row the booking already holds, if any.
+    """
+    rule = capacity_for(service, package)
+    if rule is None:
+        return True
+    slot = (
+        CapacitySlot.objects.filter(service_capacity=rule, starts_at=slot_start(moment, rule.slot_minutes))
+        .values_list('pk', 'used', 'capacity')
+        .first()
+    )
+    if slot is None:
+        return rule.capacity > 0
+    slot_id, used, slot_capacity = slot
+    return slot_id == held_slot or used < slot_capacity
+
+
+def _touch(rule):
+    ServiceCapacity.objects.filter(pk=rule.pk).update(version=F('version') + 1)
+
+
+def available_slots(rule, start, end):
+    """
+    ``(starts_at, capacity, available)`` for every slot of ``rule`` starting
+    in ``[start, end)``, from the counter rows of that range in one query.
+    """
+    step = timedelta(minutes=rule.slot_minutes)
+    first = slot_start(start, rule.slot_minutes)
+    if first < start:
+        first += step
+
+    used = dict(
+        CapacitySlot.objects.filter(service_capacity=rule, starts_at__gte=first, starts_at__lt=end)
+        .values_list('starts_at', 'used')
+    )
+    slots = []
+    moment = first
+    while moment < end:
+        taken = used.get(moment, 0)
+        slots.append((moment, rule.capacity, max(rule.capacity - taken, 0)))
+        moment += step
+    return slots
+
+
+def availability_calendar(rule, start, end):
+    """
+    Remaining capacity of ``rule`` per day and per slot for the slots starting
+    in ``[start, end)``, grouped by local date. Slots already started are left
+    out.
+    """
+    step = timedelta(minutes=rule.slot_minutes)
+    start = max(start, slot_start(django_timezone.now(), rule.slot_minutes) + step)
+    key = f'availability:{rule.pk}:{rule.version}:{start.timestamp():.0f}:{end.timestamp():.0f}'
+
+    calendar = cache.get(key)
+    if calendar is None:
+        days = {}
+        for starts_at, _capacity, available in available_slots(rule, start, end):
+            day = days.setdefault(django_timezone.localdate(starts_at), {'available': 0, 'slots': []})
+            day['available'] += available
+            day['slots'].append({'starts_at': _datetime.to_representation(starts_at), 'available': available})
+        calendar = [{'date': day.isoformat(), **data} for day, data in days.items()]
+        cache.set(key, calendar, CALENDAR_CACHE_TIMEOUT)
+    return calendar
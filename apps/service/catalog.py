@@ -0,0 +1,112 @@
+"""
+In-process snapshot of the public service catalog.
+
+Each worker keeps the catalog pre-serialized for every supported language
+(see ``apps.service.projections``) and serves list/detail responses from
+memory. The snapshot is rebuilt only
+when ``CatalogVersion`` moves, which the signals in ``apps.service.signals``
+take care of whenever staff edit the catalog.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.http import Http404
+
+from common.localization import SUPPORTED_LANGUAGES
+from . import projections
+from .models import Service, CatalogVersion
+
+# Seconds a worker trusts its snapshot before re-reading the catalog version
+VERSION_CHECK_INTERVAL = getattr(settings, 'CATALOG_VERSION_CHECK_INTERVAL', 2.0)
+
+
+class CatalogSnapshot:
+    """Pre-serialized catalog for one catalog version. Treat the data as read-only."""
+
+    __slots__ = ('version', '_listing', '_by_type', '_details')
+
+    def __init__(self, version, listing, details):
+        self.version = version
+        self._listing = listing
+        self._details = details
+        self._by_type = {
+            language: self._group_by_type(services)
+            for language, services in listing.items()
+        }
+
+    @staticmethod
+    def _group_by_type(services):
+        grouped = {}
+        for service in services:
+            grouped.setdefault(service['service_type'], []).append(service)
+        return grouped
+
+    def service_list(self, language, service_type=None):
+        if service_type:
+            return self._by_type[language].get(service_type, [])
+        return self._listing[language]
+
+    def details(self, language):
+        return self._details[language]
+
+    def service_detail(self, language, pk):
+        try:
+            return self._details[language][pk]
+        except KeyError:
+            raise Http404(f"No {Service._meta.object_name} matches the given query.")
+
+
+def build_snapshot(version):
+    listing, details = {}, {}
+    for language in SUPPORTED_LANGUAGES:
+        listing[language], details[language] = projections.project_catalog(language)
+    return CatalogSnapshot(version, listing, details)
+
+
+_lock = threading.Lock()
+_snapshot = None
+_version = None
+_checked_at = 0.0
+
+
+def current_version(fresh=False):
+    """
+    Catalog version as last read from the database, re-read every few seconds
+    or right away with ``fresh``.
+    """
+    global _version, _checked_at
+
+    if fresh or _version is None or time.monotonic() - _checked_at >= VERSION_CHECK_INTERVAL:
+        _version = CatalogVersion.current()
+        _checked_at = time.monotonic()
+    return _version
+
+
+def response_version(request, *args, **kwargs):
+    """
+    ``conditional_get`` version of the responses served from the snapshot or
+    the pre-rendered files, both of which are built for a catalog version
+    """
+    return current_version()
+
+
+def get_snapshot(fresh=False):
+    """Return the worker's catalog snapshot, rebuilding it if the catalog changed"""
+    global _snapshot
+
+    version = current_version(fresh)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = build_snapshot(version)
+        return _snapshot
+
+
+def expire_snapshot():
+    """Force the next request of this worker to re-check the catalog version"""
+    global _version
+    _version = None
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from apps.service import benchmarks
+from apps.service.models import Service
+from apps.service.serializers import ServiceDetailSerializer
+from common.renderers import FastJSONRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        'Time FastJSONRenderer against DRF\'s JSONRenderer on the service detail payload '
+        'of a generated catalog (rolled back afterwards)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--addons', type=int, default=200, help='Addons in the service')
+        parser.add_argument('--number', type=int, default=200, help='Runs per timing')
+
+    def handle(self, *args, **options):
+        with benchmarks.generated_catalog(services=1, addons=options['addons']) as pks:
+            service = Service.objects.for_detail().get(pk=pks[0])
+            for language in ('en', 'ar'):
+                data = ServiceDetailSerializer(service, context={'language': language}).data
+                rendered = {}
+                for renderer in (JSONRenderer(), FastJSONRenderer()):
+                    name = type(renderer).__name__
+                    rendered[name] = renderer.render(data)
+                    elapsed = benchmarks.best_of(lambda: renderer.render(data), options['number'])
+                    self.stdout.write(
+                        f'{language} {name:>16}: {elapsed:7.3f}ms for {len(rendered[name])} bytes'
+                    )
+                if len(set(rendered.values())) != 1:
+                    self.stderr.write(self.style.ERROR(f'{language}: the renderers disagree'))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.service import benchmarks
+from apps.service.models import Service
+from apps.service.serializers import ServiceDetailSerializer, ServiceListSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Time the catalog serializers on a generated catalog (rolled back afterwards), '
+        'with LocalizedField and with the per-field language lookup it replaced'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=30)
+        parser.add_argument('--addons', type=int, default=40, help='Addons per service')
+        parser.add_argument('--number', type=int, default=20, help='Runs per timing')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        variants = (
+            ('localized', ServiceListSerializer, ServiceDetailSerializer),
+            ('per-field', benchmarks.per_field_language(ServiceListSerializer),
+             benchmarks.per_field_language(ServiceDetailSerializer)),
+        )
+
+        with benchmarks.generated_catalog(options['services'], options['addons']) as pks:
+            services = list(Service.objects.filter(pk__in=pks).for_list())
+            detail = Service.objects.for_detail().get(pk=pks[0])
+            self.stdout.write(
+                f"{len(services)} services, {detail.addons.count()} addons in the detail, "
+                f"best of 5 x {options['number']} runs"
+            )
+
+            for language in ('en', 'ar'):
+                # A fresh request per run, as the language is memoized on it
+                def request():
+                    return Request(factory.get('/', HTTP_ACCEPT_LANGUAGE=f'{language},en;q=0.5'))
+
+                for name, list_serializer, detail_serializer in variants:
+                    list_ms = benchmarks.best_of(
+                        lambda: list_serializer(services, many=True, context={'request': request()}).data,
+                        options['number'],
+                    )
+                    detail_ms = benchmarks.best_of(
+                        lambda: detail_serializer(detail, context={'request': request()}).data,
+                        options['number'],
+                    )
+                    self.stdout.write(f'{language} {name:>9}: list {list_ms:7.2f}ms  detail {detail_ms:7.2f}ms')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from apps.service import prerender
+
+
+class Command(BaseCommand):
+    help = 'Write pre-rendered catalog and contact info JSON files to STATIC_ROOT/api'
+
+    def handle(self, *args, **options):
+        # Runs before every web dyno starts, whether or not the files are used
+        if not prerender.ENABLED:
+            self.stdout.write('PRERENDER_API is off, nothing to render')
+            return
+        files = prerender.render_all()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully pre-rendered {len(files)} API responses to {prerender.OUTPUT_DIR}')
+        )
@@ -0,0 +1,64 @@
+# Generated by Django 6.0a1 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+from common.utils import normalize_email, normalize_phone
+
+TRIGRAM_INDEXES = (
+    ('booking_email_trgm_idx', 'customer_email_normalized'),
+    ('booking_phone_trgm_idx', 'customer_phone_normalized'),
+)
+
+
+def backfill_lookup_columns(apps, schema_editor):
+    Booking = apps.get_model('service', 'Booking')
+    batch = []
+    for booking in Booking.objects.only('customer_email', 'customer_phone').iterator(chunk_size=2000):
+        booking.customer_email_normalized = normalize_email(booking.customer_email)
+        booking.customer_phone_normalized = normalize_phone(booking.customer_phone)
+        batch.append(booking)
+        if len(batch) >= 2000:
+            Booking.objects.bulk_update(batch, ['customer_email_normalized', 'customer_phone_normalized'])
+            batch = []
+    Booking.objects.bulk_update(batch, ['customer_email_normalized', 'customer_phone_normalized'])
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Substring search support; other databases fall back to a scan
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('service', 'Booking')._meta.db_table)
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0009_booking_booking_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='customer_email_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='customer_phone_normalized',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill_lookup_columns, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
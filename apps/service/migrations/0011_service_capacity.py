@@ -0,0 +1,60 @@
+# Generated by Django 6.0a1 on 2026-10-18 12:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0010_booking_customer_lookup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CapacitySlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('used', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='capacity_slot',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='service.capacityslot'),
+        ),
+        migrations.CreateModel(
+            name='ServiceCapacity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('slot_minutes', models.PositiveIntegerField(choices=[(15, '15 minutes'), (30, '30 minutes'), (60, '1 hour'), (120, '2 hours'), (240, '4 hours'), (480, '8 hours')], default=60)),
+                ('capacity', models.PositiveIntegerField(default=1, help_text='Bookings that can start in the same slot')),
+                ('package', models.ForeignKey(blank=True, help_text='Leave empty for a rule covering every package of the service', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='capacities', to='service.package')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='capacities', to='service.service')),
+            ],
+            options={
+                'verbose_name_plural': 'Service capacities',
+            },
+        ),
+        migrations.AddField(
+            model_name='capacityslot',
+            name='service_capacity',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='service.servicecapacity'),
+        ),
+        migrations.AddConstraint(
+            model_name='servicecapacity',
+            constraint=models.UniqueConstraint(fields=('service', 'package'), name='unique_package_capacity'),
+        ),
+        migrations.AddConstraint(
+            model_name='servicecapacity',
+            constraint=models.UniqueConstraint(condition=models.Q(('package__isnull', True)), fields=('service',), name='unique_service_capacity'),
+        ),
+        migrations.AddConstraint(
+            model_name='capacityslot',
+            constraint=models.UniqueConstraint(fields=('service_capacity', 'starts_at'), name='unique_capacity_slot'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0a1 on 2026-10-18 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0011_service_capacity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicecapacity',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
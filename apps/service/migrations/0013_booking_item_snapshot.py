@@ -0,0 +1,91 @@
+# Generated by Django 6.0a1 on 2026-10-18 12:47
+
+from django.db import migrations, models
+
+SNAPSHOT_FIELDS = [
+    'service_name', 'service_name_ar', 'service_type',
+    'package_name', 'package_name_ar', 'package_price', 'addon_lines',
+]
+
+
+def backfill_item_snapshots(apps, schema_editor):
+    # Existing bookings get the catalog as it is now, the best record left
+    Booking = apps.get_model('service', 'Booking')
+    Addon = apps.get_model('service', 'Addon')
+    bookings = Booking.objects.select_related('service', 'package').prefetch_related(
+        models.Prefetch('addons', queryset=Addon.objects.select_related('category').order_by('order'))
+    )
+    batch = []
+    for booking in bookings.iterator(chunk_size=500):
+        booking.service_name = booking.service.name
+        booking.service_name_ar = booking.service.name_ar
+        booking.service_type = booking.service.service_type
+        booking.package_name = booking.package.name
+        booking.package_name_ar = booking.package.name_ar
+        booking.package_price = booking.package.price
+        booking.addon_lines = [
+            {
+                'id': addon.pk,
+                'name': addon.name,
+                'name_ar': addon.name_ar,
+                'description': addon.description,
+                'description_ar': addon.description_ar,
+                'category': addon.category_id,
+                'category_name': addon.category.name if addon.category_id else None,
+                'price': str(addon.price),
+                'is_active': addon.is_active,
+                'order': addon.order,
+            }
+            for addon in booking.addons.all()
+        ]
+        batch.append(booking)
+        if len(batch) >= 500:
+            Booking.objects.bulk_update(batch, SNAPSHOT_FIELDS)
+            batch = []
+    Booking.objects.bulk_update(batch, SNAPSHOT_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0012_capacity_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='addon_lines',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='package_name',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='package_name_ar',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='package_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=8),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='service_name',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='service_name_ar',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='service_type',
+            field=models.CharField(default='', editable=False, max_length=50),
+        ),
+        migrations.RunPython(backfill_item_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0a1 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('service', '0013_booking_item_snapshot'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='booking_date',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
@@ -1,9 +1,38 @@
-from django.db import models
-from common.utils import BaseModel
+import re
+
+from django.db import models, transaction
+from common.utils import BaseModel, normalize_email, normalize_phone
 from cloudinary.models import CloudinaryField
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
+class ServiceQuerySet(models.QuerySet):
+    """Query plans for the public catalog endpoints.
+
+    Every nested serializer gets its own prefetch so a catalog read costs the
+    same number of queries whatever the number of services, addons or rows.
+    """
+
+    def for_list(self):
+        """Relations rendered by ``ServiceListSerializer``"""
+        return self.prefetch_related(
+            models.Prefetch('features', queryset=ServiceFeature.objects.order_by(*ServiceFeature._meta.ordering)),
+            models.Prefetch('contents', queryset=ServiceContent.objects.order_by(*ServiceContent._meta.ordering)),
+        )
+
+    def for_detail(self):
+        """Relations rendered by ``ServiceDetailSerializer``"""
+        return self.for_list().prefetch_related(
+            models.Prefetch('ratings', queryset=ServiceRating.objects.order_by(*ServiceRating._meta.ordering)),
+            models.Prefetch('packages', queryset=Package.objects.order_by(*Package._meta.ordering)),
+            models.Prefetch(
+                'addons',
+                queryset=Addon.objects.select_related('category').order_by(*Addon._meta.ordering)
+            ),
+        )
+
+
 class Service(BaseModel):
     SERVICE_TYPES = [
         ('home_cleaning', 'Home Cleaning'),
@@ -34,6 +63,8 @@ class Service(BaseModel):
     is_active = models.BooleanField(default=True)
     image = CloudinaryField('image', blank=True, null=True)
 
+    objects = ServiceQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -301,6 +332,94 @@ class Addon(BaseModel):
             return self.description_ar
         return self.description
 
+class ServiceCapacity(BaseModel):
+    """
+    How many bookings of a service can start in one time slot, e.g. the
+    number of crews. A rule for a package overrides the service-wide one;
+    services without any rule accept bookings at any time.
+    """
+    SLOT_CHOICES = [
+        (15, _('15 minutes')),
+        (30, _('30 minutes')),
+        (60, _('1 hour')),
+        (120, _('2 hours')),
+        (240, _('4 hours')),
+        (480, _('8 hours')),
+    ]
+
+    service = models.ForeignKey(Service, related_name='capacities', on_delete=models.CASCADE)
+    package = models.ForeignKey(
+        Package, related_name='capacities', on_delete=models.CASCADE, null=True, blank=True,
+        help_text=_('Leave empty for a rule covering every package of the service')
+    )
+    slot_minutes = models.PositiveIntegerField(choices=SLOT_CHOICES, default=60)
+    capacity = models.PositiveIntegerField(default=1, help_text=_('Bookings that can start in the same slot'))
+    # Bumped by every reservation change; keys the cached availability calendars
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+
+    class Meta:
+        verbose_name_plural = 'Service capacities'
+        constraints = [
+            models.UniqueConstraint(fields=['service', 'package'], name='unique_package_capacity'),
+            models.UniqueConstraint(
+                fields=['service'], condition=models.Q(package__isnull=True), name='unique_service_capacity'
+            ),
+        ]
+
+    def __str__(self):
+        scope = self.package.name if self.package_id else self.service.name
+        return f"{scope}: {self.capacity} per {self.get_slot_minutes_display()}"
+
+    def save(self, *args, **kwargs):
+        # version only ever moves through F() updates, never from a stale instance
+        bump = not self._state.adding
+        if bump:
+            self.version = models.F('version') + 1
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['version'])
+        # Slot counters carry their own copy of the capacity for the
+        # conditional UPDATE in apps.service.capacity.reserve()
+        self.slots.update(capacity=self.capacity)
+
+
+class CapacitySlot(models.Model):
+    """Reservation counter of one slot of a ``ServiceCapacity``, created on first booking"""
+    service_capacity = models.ForeignKey(ServiceCapacity, related_name='slots', on_delete=models.CASCADE)
+    starts_at = models.DateTimeField()
+    capacity = models.PositiveIntegerField()
+    used = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['service_capacity', 'starts_at'], name='unique_capacity_slot'),
+        ]
+
+    def __str__(self):
+        return f"{self.starts_at:%Y-%m-%d %H:%M} ({self.used}/{self.capacity})"
+
+    @classmethod
+    def release(cls, slot_id):
+        """Give back one reservation of a slot"""
+        # The rule row is locked before the counter, in the order reserve() takes them
+        ServiceCapacity.objects.filter(slots=slot_id).update(version=models.F('version') + 1)
+        cls.objects.filter(pk=slot_id, used__gt=0).update(used=models.F('used') - 1)
+
+
+class BookingQuerySet(models.QuerySet):
+    def search_customer(self, email=None, phone=None, match='exact'):
+        """Filter on the normalized customer columns, see ``Booking.CUSTOMER_MATCHES``"""
+        lookup = self.model.CUSTOMER_MATCHES[match]
+        queryset = self
+        if email:
+            queryset = queryset.filter(**{f'customer_email_normalized__{lookup}': normalize_email(email)})
+        if phone:
+            # A fragment from the middle of a number has no country code to add
+            phone = re.sub(r'\D', '', phone) if match == 'contains' else normalize_phone(phone)
+            queryset = queryset.filter(**{f'customer_phone_normalized__{lookup}': phone})
+        return queryset
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -310,19 +429,176 @@ class Booking(models.Model):
         ('cancelled', 'Cancelled'),
     ]
 
+    # Customer search modes and their lookups. exact and prefix use the B-tree
+    # indexes (plus varchar_pattern_ops on Postgres for LIKE 'x%'), contains
+    # uses the trigram indexes on Postgres and a scan elsewhere.
+    CUSTOMER_MATCHES = {'exact': 'exact', 'prefix': 'startswith', 'contains': 'contains'}
+
     service = models.ForeignKey(Service, on_delete=models.CASCADE)
     package = models.ForeignKey(Package, on_delete=models.CASCADE)
     addons = models.ManyToManyField(Addon, blank=True)
     customer_name = models.CharField(max_length=100)
     customer_email = models.EmailField()
     customer_phone = models.CharField(max_length=20)
+    # Indexed lookup forms of the two above, kept in sync by save()
+    customer_email_normalized = models.CharField(max_length=254, default='', editable=False, db_index=True)
+    customer_phone_normalized = models.CharField(max_length=20, default='', editable=False, db_index=True)
     address = models.TextField()
-    booking_date = models.DateTimeField()
+    booking_date = models.DateTimeField(db_index=True)
     special_requests = models.TextField(blank=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Slot counter holding this booking's reservation, released on cancellation
+    capacity_slot = models.ForeignKey(
+        CapacitySlot, related_name='bookings', on_delete=models.SET_NULL, null=True, blank=True, editable=False
+    )
+
+    # What was purchased, as it was at booking time (see capture_items()).
+    # Reads never join the catalog, and later catalog edits leave it alone.
+    service_name = models.CharField(max_length=100, default='', editable=False)
+    service_name_ar = models.CharField(max_length=100, default='', editable=False)
+    service_type = models.CharField(max_length=50, default='', editable=False)
+    package_name = models.CharField(max_length=100, default='', editable=False)
+    package_name_ar = models.CharField(max_length=100, default='', editable=False)
+    package_price = models.DecimalField(max_digits=8, decimal_places=2, default=0, editable=False)
+    addon_lines = models.JSONField(default=list, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order, see common.pagination.KeysetPagination
+            models.Index(fields=['created_at', 'id'], name='booking_created_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_name} - {self.service_name} - {self.package_name}"
+
+    # Columns remembered as loaded, so save() can tell what was edited
+    TRACKED_FIELDS = ('service_id', 'package_id', 'booking_date', 'status')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded = {name: instance.__dict__[name] for name in cls.TRACKED_FIELDS if name in instance.__dict__}
+        return instance
+
+    def _changed(self, *names):
+        loaded = getattr(self, '_loaded', {})
+        return any(name in loaded and loaded[name] != getattr(self, name) for name in names)
+
+    @staticmethod
+    def addon_line(addon):
+        """Snapshot of one addon for ``addon_lines``"""
+        return {
+            'id': addon.pk,
+            'name': addon.name,
+            'name_ar': addon.name_ar,
+            'description': addon.description,
+            'description_ar': addon.description_ar,
+            'category': addon.category_id,
+            'category_name': addon.category.name if addon.category_id else None,
+            'price': str(addon.price),
+            'is_active': addon.is_active,
+            'order': addon.order,
+        }
+
+    def capture_items(self, service, package, addons=None):
+        """Copy the purchased items onto the booking; addons in catalog order"""
+        self.service_name = service.name
+        self.service_name_ar = service.name_ar
+        self.service_type = service.service_type
+        self.package_name = package.name
+        self.package_name_ar = package.name_ar
+        self.package_price = package.price
+        if addons is not None:
+            self.addon_lines = [self.addon_line(addon) for addon in addons]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if (self._state.adding and not self.service_name) or self._changed('service_id', 'package_id'):
+            # Bookings created or re-pointed outside the API, e.g. in the
+            # admin; their addons are captured by the m2m_changed handler in signals
+            self.capture_items(self.service, self.package)
+            if update_fields is not None:
+                update_fields = kwargs['update_fields'] = {
+                    *update_fields, 'service_name', 'service_name_ar', 'service_type',
+                    'package_name', 'package_name_ar', 'package_price',
+                }
+
+        self.customer_email_normalized = normalize_email(self.customer_email)
+        self.customer_phone_normalized = normalize_phone(self.customer_phone)
+        if update_fields is not None and {'customer_email', 'customer_phone'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'customer_email_normalized', 'customer_phone_normalized'}
+
+        # A cancelled booking frees its slot, exactly once; a new, moved or
+        # reinstated one takes the slot of its time, raising SlotUnavailable
+        # (see apps.service.capacity) when it is full
+        cancelled = self.status == 'cancelled'
+        moved = self._changed('service_id', 'package_id', 'booking_date')
+        release = self.capacity_slot_id is not None and (cancelled or moved)
+        reserve = not cancelled and (
+            self._state.adding or moved or getattr(self, '_loaded', {}).get('status') == 'cancelled'
+        )
+        if release or reserve:
+            from . import capacity
+
+            held_slot = self.capacity_slot_id
+            try:
+                with transaction.atomic():
+                    if release:
+                        CapacitySlot.release(held_slot)
+                        self.capacity_slot = None
+                    if reserve:
+                        self.capacity_slot_id = capacity.reserve_for(self)
+                    if kwargs.get('update_fields') is not None:
+                        kwargs['update_fields'] = {*kwargs['update_fields'], 'capacity_slot'}
+                    super().save(*args, **kwargs)
+            except BaseException:
+                # The release was rolled back, the booking still holds its slot
+                self.capacity_slot_id = held_slot
+                raise
+        else:
+            super().save(*args, **kwargs)
+        self._loaded = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+
+class CatalogVersion(models.Model):
+    """
+    Single-row counter bumped whenever the public catalog changes.
+
+    Workers compare it with the version of their in-memory catalog snapshot
+    and rebuild only when it moved (see ``apps.service.catalog``). Contact
+    info edits bump it too since it also versions the pre-rendered API files
+    (see ``apps.service.prerender``).
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    SINGLETON_ID = 1
+
     def __str__(self):
-        return f"{self.customer_name} - {self.service.name} - {self.package.name}"
+        return f"Catalog v{self.version}"
+
+    @classmethod
+    def current(cls):
+        version = cls.objects.filter(pk=cls.SINGLETON_ID).values_list('version', flat=True).first()
+        return version or 0
+
+    @classmethod
+    def bump(cls):
+        if cls._increment():
+            return
+        _, created = cls.objects.get_or_create(pk=cls.SINGLETON_ID, defaults={'version': 1})
+        if not created:
+            # Another process created the row first
+            cls._increment()
+
+    @classmethod
+    def _increment(cls):
+        return cls.objects.filter(pk=cls.SINGLETON_ID).update(
+            version=models.F('version') + 1, updated_at=timezone.now()
+        )
@@ -0,0 +1,257 @@
+"""
+Pre-rendered JSON for the busiest anonymous read endpoints.
+
+``render_all()`` writes the catalog, contact info and settings contact info
+responses for every language (and every ``service_type`` filter) to
+content-hashed files under ``STATIC_ROOT/api/`` with gzip/brotli siblings,
+plus a ``manifest.json`` mapping response keys to file names.
+
+Every web dyno renders its own files when it boots (see the Procfile), as
+dyno filesystems are neither shared nor kept across restarts. Files present
+when the process starts are served by WhiteNoise under ``STATIC_URL`` with
+far-future cache headers. The API views fall through to the same files via
+``prerendered_response()`` as long as the manifest was rendered for the
+current catalog version, so they never hit the database.
+
+Once the catalog moves on, each process re-renders in a background thread
+(``render_in_background()``), after an edit it committed itself or on the
+first request finding its manifest stale, and serves its snapshot meanwhile.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from whitenoise.compress import Compressor
+
+from apps.contact_us.models import ContactMethod, OfficeLocation
+from apps.contact_us.serializers import ContactInfoSerializer
+from apps.settings.models import ContactInfo
+from apps.settings.serializers import ContactInfoSerializer as SettingsContactInfoSerializer
+from common.localization import SUPPORTED_LANGUAGES
+from common.renderers import FastJSONRenderer
+from . import catalog
+from .models import Service, CatalogVersion
+
+ENABLED = getattr(settings, 'PRERENDER_API', False)
+OUTPUT_DIR = os.path.join(settings.STATIC_ROOT, 'api')
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, 'manifest.json')
+# Seconds between background render attempts of one process
+RENDER_RETRY_INTERVAL = 30
+
+logger = logging.getLogger(__name__)
+
+# Pre-compressed siblings in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def service_list_key(language, service_type=None):
+    if service_type:
+        return f'services.{service_type}.{language}'
+    return f'services.{language}'
+
+
+def service_detail_key(language, pk):
+    return f'services/{pk}.{language}'
+
+
+def contact_info_key(language):
+    return f'contact-info.{language}'
+
+
+def settings_contact_info_key(language):
+    return f'settings-contact-info.{language}'
+
+
+def _payloads(version):
+    snapshot = catalog.build_snapshot(version)
+    contact_info = {
+        'contact_methods': list(ContactMethod.objects.filter(is_active=True)),
+        'office_locations': list(OfficeLocation.objects.all()),
+    }
+    settings_contact_info = ContactInfo.objects.first()
+
+    for language in SUPPORTED_LANGUAGES:
+        context = {'language': language}
+        yield service_list_key(language), snapshot.service_list(language)
+        for service_type, _label in Service.SERVICE_TYPES:
+            yield service_list_key(language, service_type), snapshot.service_list(language, service_type)
+        for pk, data in snapshot.details(language).items():
+            yield service_detail_key(language, pk), data
+        yield contact_info_key(language), ContactInfoSerializer(contact_info, context=context).data
+        if settings_contact_info is not None:
+            yield (settings_contact_info_key(language),
+                   SettingsContactInfoSerializer(settings_contact_info, context=context).data)
+
+
+def _write_file(key, content, compressor):
+    digest = hashlib.md5(content, usedforsecurity=False).hexdigest()[:12]
+    name = f'{key}.{digest}.json'
+    path = os.path.join(OUTPUT_DIR, name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        compressor.compress(path)
+    return name
+
+
+def render_all():
+    """Render every pre-rendered response and publish a new manifest"""
+    version = CatalogVersion.current()
+    renderer = FastJSONRenderer()
+    compressor = Compressor(quiet=True)
+
+    files = {
+        key: _write_file(key, renderer.render(data), compressor)
+        for key, data in _payloads(version)
+    }
+    previous = _read_manifest()
+
+    tmp_path = f'{MANIFEST_PATH}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': version, 'files': files}, f)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+    # Keep the previous generation around for requests still reading it
+    keep = set(files.values())
+    if previous:
+        keep.update(previous['files'].values())
+    _remove_stale_files(keep)
+    return files
+
+
+def _remove_stale_files(keep):
+    for dirpath, _dirs, filenames in os.walk(OUTPUT_DIR):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, OUTPUT_DIR)
+            for _encoding, suffix in ENCODINGS:
+                name = name.removesuffix(suffix)
+            if name.endswith('.json') and name != 'manifest.json' and name not in keep:
+                os.remove(path)
+
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def schedule_render():
+    """Re-render after the current transaction commits, outside the request"""
+    if ENABLED:
+        transaction.on_commit(render_in_background)
+
+
+def render_if_stale():
+    # An admin save with inlines schedules one render per saved row; only the
+    # first one finds the manifest behind the catalog version
+    manifest = _read_manifest()
+    if manifest is None or manifest['version'] != CatalogVersion.current():
+        render_all()
+
+
+_render_lock = threading.Lock()
+_render_started = None
+
+
+def render_in_background():
+    """Start ``render_if_stale()`` in a thread unless this process rendered just now"""
+    global _render_started
+
+    if _render_started is not None and time.monotonic() - _render_started < RENDER_RETRY_INTERVAL:
+        return
+    if not _render_lock.acquire(blocking=False):
+        return
+    _render_started = time.monotonic()
+    threading.Thread(target=_render, name='prerender', daemon=True).start()
+
+
+def _render():
+    try:
+        render_if_stale()
+    except Exception:
+        logger.exception('Pre-rendering the API responses failed')
+    finally:
+        connection.close()
+        _render_lock.release()
+
+
+_manifest = None
+_manifest_mtime = None
+_file_cache = {}
+
+
+def _current_manifest():
+    global _manifest, _manifest_mtime
+
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except OSError:
+        return None
+    if mtime != _manifest_mtime:
+        _manifest = _read_manifest()
+        _manifest_mtime = mtime
+        _file_cache.clear()
+    return _manifest
+
+
+def _read_file(path):
+    content = _file_cache.get(path)
+    if content is None:
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except OSError:
+            content = b''
+        _file_cache[path] = content
+    return content
+
+
+def prerendered_response(request, key):
+    """
+    Response built from the pre-rendered file for ``key``, or None when the
+    view has to render it itself (disabled, stale manifest, unknown key or a
+    non-JSON renderer was negotiated).
+    """
+    if not ENABLED or getattr(request, 'accepted_renderer', None) is None:
+        return None
+    if request.accepted_renderer.format != 'json':
+        return None
+
+    manifest = _current_manifest()
+    if manifest is None or manifest['version'] != catalog.current_version():
+        render_in_background()
+        return None
+    name = manifest['files'].get(key)
+    if name is None:
+        return None
+
+    path = os.path.join(OUTPUT_DIR, name)
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for encoding, suffix in ENCODINGS:
+        if encoding in accept_encoding:
+            content = _read_file(path + suffix)
+            if content:
+                break
+    else:
+        encoding, content = None, _read_file(path)
+    if not content:
+        return None
+
+    response = HttpResponse(content, content_type='application/json')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding', 'Accept-Language'))
+    return response
@@ -0,0 +1,118 @@
+"""
+Per-worker price table shared by quotes and booking creation.
+
+The table is derived from the catalog snapshot (``apps.service.catalog``),
+so it is rebuilt exactly when the catalog version moves, which every
+``Package``/``Addon`` save does. On a warm worker a quote never touches the
+database.
+"""
+import threading
+from decimal import Decimal
+
+from common.localization import SUPPORTED_LANGUAGES
+from . import catalog
+
+
+class PricingError(Exception):
+    """A quote request that does not match the catalog, reported against ``field``"""
+
+    def __init__(self, field, message):
+        super().__init__(message)
+        self.field = field
+        self.message = message
+
+
+class Quote:
+    __slots__ = ('service_id', 'lines', 'total')
+
+    def __init__(self, service_id, lines):
+        self.service_id = service_id
+        self.lines = lines
+        self.total = sum((line['price'] for line in lines), Decimal('0'))
+
+    @property
+    def package_id(self):
+        return self.lines[0]['id']
+
+    @property
+    def addon_ids(self):
+        return [line['id'] for line in self.lines[1:]]
+
+
+class PriceTable:
+    """Prices and localized names of active services' packages and addons, keyed by id"""
+
+    __slots__ = ('version', '_services')
+
+    def __init__(self, version, services):
+        self.version = version
+        self._services = services
+
+    def quote(self, service_id, package_id, addon_ids=()):
+        """
+        Itemized ``Quote`` for a package and addons of a service: the package
+        line first, then the addons in catalog order. Raises ``PricingError``.
+        """
+        service = self._services.get(service_id)
+        if service is None:
+            raise PricingError('service', 'This service is not available for booking.')
+
+        package = service['packages'].get(package_id)
+        if package is None or not package['is_active']:
+            raise PricingError('package', 'Package does not belong to the selected service.')
+
+        addons, invalid = [], []
+        for addon_id in dict.fromkeys(addon_ids):
+            addon = service['addons'].get(addon_id)
+            if addon is None or not addon['is_active']:
+                invalid.append(addon_id)
+            else:
+                addons.append(addon)
+        if invalid:
+            raise PricingError(
+                'addon_ids', f"Invalid addons for the selected service: {', '.join(map(str, sorted(invalid)))}."
+            )
+
+        addons.sort(key=lambda addon: addon['position'])
+        return Quote(service_id, [package, *addons])
+
+
+def build_price_table(snapshot):
+    services = {}
+    for language in SUPPORTED_LANGUAGES:
+        for service_id, detail in snapshot.details(language).items():
+            service = services.setdefault(service_id, {'packages': {}, 'addons': {}})
+            for kind, line_type in (('packages', 'package'), ('addons', 'addon')):
+                for position, item in enumerate(detail[kind]):
+                    line = service[kind].setdefault(item['id'], {
+                        'type': line_type,
+                        'id': item['id'],
+                        'price': Decimal(item['price']),
+                        'is_active': item['is_active'],
+                        'position': position,
+                        'name': {},
+                    })
+                    line['name'][language] = item['name']
+    return PriceTable(snapshot.version, services)
+
+
+_lock = threading.Lock()
+_table = None
+
+
+def get_price_table(fresh=False):
+    """
+    Return the worker's price table. ``fresh`` re-reads the catalog version
+    first, for callers that must not charge a price changed seconds ago.
+    """
+    global _table
+
+    snapshot = catalog.get_snapshot(fresh)
+    table = _table
+    if table is not None and table.version == snapshot.version:
+        return table
+
+    with _lock:
+        if _table is None or _table.version != snapshot.version:
+            _table = build_price_table(snapshot)
+        return _table
@@ -0,0 +1,167 @@
+"""
+Read-only projections of the public catalog built from ``.values()`` rows.
+
+They produce exactly what ``ServiceListSerializer`` and
+``ServiceDetailSerializer`` render, without instantiating a model or a
+serializer field per row: each relation is fetched with one query and the
+nested dicts are assembled in a single pass grouped by ``service_id``. The
+serializers stay the reference implementation for writes and the admin.
+"""
+from types import SimpleNamespace
+
+from rest_framework import serializers
+
+from common.localization import localized_expression
+from .models import Service, ServiceFeature, ServiceContent, ServiceRating, Package, Addon
+
+# Unbound DRF fields, used only for their ``to_representation`` formatting
+_price = serializers.DecimalField(max_digits=8, decimal_places=2)
+_datetime = serializers.DateTimeField()
+_image_field = Service._meta.get_field('image')
+
+
+def _localized_rows(queryset, columns, localized, language):
+    """
+    ``.values()`` rows selecting one column per translated field: the English
+    column, or for Arabic the Arabic value falling back to English in SQL.
+    """
+    if language != 'ar':
+        return queryset.values(*columns)
+    # Annotations may not shadow model fields, so select them under an alias
+    plain = [column for column in columns if column not in localized]
+    rows = queryset.values(*plain, **{
+        f'_{field}': localized_expression(field, language) for field in localized
+    })
+    return (_unalias(row, localized) for row in rows)
+
+
+def _unalias(row, localized):
+    for field in localized:
+        row[field] = row.pop(f'_{field}')
+    return row
+
+
+def _group_by_service(rows, project):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row['service_id'], []).append(project(row))
+    return grouped
+
+
+def _feature(row):
+    return {
+        'id': row['id'], 'name': row['name'], 'description': row['description'],
+        'icon': row['icon'], 'order': row['order'],
+    }
+
+
+def _content(row):
+    return {'id': row['id'], 'name': row['name'], 'order': row['order']}
+
+
+def _rating(row):
+    return {
+        'id': row['id'], 'name': row['name'], 'description': row['description'],
+        'icon': row['icon'], 'order': row['order'],
+    }
+
+
+def _package(row):
+    return {
+        'id': row['id'], 'name': row['name'], 'package_type': row['package_type'],
+        'price': _price.to_representation(row['price']),
+        'square_feet': row['square_feet'], 'duration': row['duration'],
+        'description': row['description'], 'is_active': row['is_active'], 'order': row['order'],
+    }
+
+
+def _addon(row):
+    addon = {
+        'id': row['id'], 'name': row['name'], 'description': row['description'],
+        'category': row['category_id'],
+    }
+    # AddonSerializer skips category_name when the addon has no category
+    if row['category_id'] is not None:
+        addon['category_name'] = row['category__name']
+    addon.update({
+        'price': _price.to_representation(row['price']),
+        'is_active': row['is_active'], 'order': row['order'],
+    })
+    return addon
+
+
+def _image(value):
+    if value is None:
+        return None
+    return _image_field.value_to_string(SimpleNamespace(image=value))
+
+
+def _related(model, columns, localized, language):
+    queryset = model.objects.filter(service__is_active=True).order_by(*model._meta.ordering)
+    return _localized_rows(queryset, ('service_id', *columns), localized, language)
+
+
+def project_catalog(language):
+    """
+    Return ``(listing, details)`` for the active services: the service list
+    payload and a ``{pk: detail payload}`` mapping, both in ``language``.
+    """
+    services = _localized_rows(
+        Service.objects.filter(is_active=True),
+        ('id', 'name', 'start_price', 'service_type', 'description', 'icon', 'is_active',
+         'hero_title', 'sub_hero_title', 'hero_description', 'image', 'created_at', 'updated_at'),
+        ('name', 'description', 'hero_title', 'sub_hero_title', 'hero_description'),
+        language,
+    )
+    features = _group_by_service(_related(
+        ServiceFeature, ('id', 'name', 'description', 'icon', 'order'), ('name', 'description'), language
+    ), _feature)
+    contents = _group_by_service(_related(
+        ServiceContent, ('id', 'name', 'order'), ('name',), language
+    ), _content)
+    ratings = _group_by_service(_related(
+        ServiceRating, ('id', 'name', 'description', 'icon', 'order'), ('name', 'description'), language
+    ), _rating)
+    packages = _group_by_service(_related(
+        Package,
+        ('id', 'name', 'package_type', 'price', 'square_feet', 'duration', 'description', 'is_active', 'order'),
+        ('name', 'description', 'square_feet', 'duration'),
+        language,
+    ), _package)
+    addons = _group_by_service(_related(
+        Addon,
+        ('id', 'name', 'description', 'category_id', 'category__name', 'price', 'is_active', 'order'),
+        ('name', 'description'),
+        language,
+    ), _addon)
+
+    listing, details = [], {}
+    for row in services:
+        pk = row['id']
+        summary = {
+            'id': pk, 'name': row['name'], 'start_price': row['start_price'],
+            'service_type': row['service_type'], 'description': row['description'],
+            'icon': row['icon'], 'is_active': row['is_active'], 'hero_title': row['hero_title'],
+            'sub_hero_title': row['sub_hero_title'], 'hero_description': row['hero_description'],
+        }
+        image_url = row['image'].url if row['image'] else None
+
+        listing.append({
+            **summary,
+            'image_url': image_url,
+            'features': features.get(pk, []),
+            'contents': contents.get(pk, []),
+        })
+        details[pk] = {
+            **summary,
+            'image': _image(row['image']),
+            'image_url': image_url,
+            'features': features.get(pk, []),
+            'contents': contents.get(pk, []),
+            'ratings': ratings.get(pk, []),
+            'packages': packages.get(pk, []),
+            'addons': addons.get(pk, []),
+            'created_at': _datetime.to_representation(row['created_at']),
+            'updated_at': _datetime.to_representation(row['updated_at']),
+        }
+    return listing, details
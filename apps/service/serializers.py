@@ -1,90 +1,40 @@
+from django.db import transaction
 from rest_framework import serializers
+from common.localization import LocalizedField, context_language
+from . import capacity, pricing
 from .models import Service, ServiceFeature, Package, Addon, AddonCategory, Booking, ServiceContent, ServiceRating
 
 class ServiceFeatureSerializer(serializers.ModelSerializer):
-    name = serializers.SerializerMethodField()
-    description = serializers.SerializerMethodField()
+    name = LocalizedField()
+    description = LocalizedField()
 
     class Meta:
         model = ServiceFeature
         fields = ['id', 'name', 'description', 'icon', 'order']
 
-    def get_name(self, obj):
-        language = self._get_language()
-        return obj.name_ar if language == 'ar' and obj.name_ar else obj.name
-
-    def get_description(self, obj):
-        language = self._get_language()
-        return obj.description_ar if language == 'ar' and obj.description_ar else obj.description
-
-    def _get_language(self):
-        request = self.context.get('request')
-        if request:
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-        return 'en'
-
 
 class ServiceContentSerializer(serializers.ModelSerializer):
-    name = serializers.SerializerMethodField()
+    name = LocalizedField()
 
     class Meta:
         model = ServiceContent
         fields = ['id', 'name', 'order']
 
-    def get_name(self, obj):
-        language = self._get_language()
-        return obj.name_ar if language == 'ar' and obj.name_ar else obj.name
-
-    def _get_language(self):
-        request = self.context.get('request')
-        if request:
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-        return 'en'
-
 
 class ServiceRatingSerializer(serializers.ModelSerializer):
-    name = serializers.SerializerMethodField()
-    description = serializers.SerializerMethodField()
+    name = LocalizedField()
+    description = LocalizedField()
 
     class Meta:
         model = ServiceRating
         fields = ['id', 'name', 'description', 'icon', 'order']
 
-    def get_name(self, obj):
-        language = self._get_language()
-        return obj.name_ar if language == 'ar' and obj.name_ar else obj.name
-
-    def get_description(self, obj):
-        language = self._get_language()
-        return obj.description_ar if language == 'ar' and obj.description_ar else obj.description
-
-    def _get_language(self):
-        request = self.context.get('request')
-        if request:
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-        return 'en'
-
 
 class PackageSerializer(serializers.ModelSerializer):
-    name = serializers.SerializerMethodField()
-    description = serializers.SerializerMethodField()
-    square_feet = serializers.SerializerMethodField()
-    duration = serializers.SerializerMethodField()
+    name = LocalizedField()
+    description = LocalizedField()
+    square_feet = LocalizedField()
+    duration = LocalizedField()
 
     class Meta:
         model = Package
@@ -94,66 +44,20 @@ class PackageSerializer(serializers.ModelSerializer):
             'is_active', 'order'
         ]
 
-    def get_name(self, obj):
-        language = self._get_language()
-        return obj.name_ar if language == 'ar' and obj.name_ar else obj.name
-
-    def get_description(self, obj):
-        language = self._get_language()
-        return obj.description_ar if language == 'ar' and obj.description_ar else obj.description
-
-    def get_square_feet(self, obj):
-        language = self._get_language()
-        return obj.square_feet_ar if language == 'ar' and obj.square_feet_ar else obj.square_feet
-
-    def get_duration(self, obj):
-        language = self._get_language()
-        return obj.duration_ar if language == 'ar' and obj.duration_ar else obj.duration
-
-    def _get_language(self):
-        request = self.context.get('request')
-        if request:
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-        return 'en'
-
 
 class AddonCategorySerializer(serializers.ModelSerializer):
-    name = serializers.SerializerMethodField()
-    description = serializers.SerializerMethodField()
+    name = LocalizedField()
+    description = LocalizedField()
 
     class Meta:
         model = AddonCategory
         fields = ['id', 'name', 'description', 'is_active', 'order']
 
-    def get_name(self, obj):
-        language = self._get_language()
-        return obj.name_ar if language == 'ar' and obj.name_ar else obj.name
-
-    def get_description(self, obj):
-        language = self._get_language()
-        return obj.description_ar if language == 'ar' and obj.description_ar else obj.description
-
-    def _get_language(self):
-        request = self.context.get('request')
-        if request:
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-        return 'en'
-
 
 class AddonSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
-    name = serializers.SerializerMethodField()
-    description = serializers.SerializerMethodField()
+    name = LocalizedField()
+    description = LocalizedField()
 
     class Meta:
         model = Addon
@@ -162,35 +66,16 @@ class AddonSerializer(serializers.ModelSerializer):
             'category_name', 'price', 'is_active', 'order'
         ]
 
-    def get_name(self, obj):
-        language = self._get_language()
-        return obj.name_ar if language == 'ar' and obj.name_ar else obj.name
-
-    def get_description(self, obj):
-        language = self._get_language()
-        return obj.description_ar if language == 'ar' and obj.description_ar else obj.description
-
-    def _get_language(self):
-        request = self.context.get('request')
-        if request:
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-        return 'en'
-
 
 class ServiceListSerializer(serializers.ModelSerializer):
     features = ServiceFeatureSerializer(many=True, read_only=True)
     contents = ServiceContentSerializer(many=True, read_only=True)
     image_url = serializers.SerializerMethodField()
-    name = serializers.SerializerMethodField()
-    description = serializers.SerializerMethodField()
-    hero_title = serializers.SerializerMethodField()
-    sub_hero_title = serializers.SerializerMethodField()
-    hero_description = serializers.SerializerMethodField()
+    name = LocalizedField()
+    description = LocalizedField()
+    hero_title = LocalizedField()
+    sub_hero_title = LocalizedField()
+    hero_description = LocalizedField()
 
     class Meta:
         model = Service
@@ -205,37 +90,6 @@ class ServiceListSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
-    def get_name(self, obj):
-        language = self._get_language()
-        return obj.name_ar if language == 'ar' and obj.name_ar else obj.name
-
-    def get_description(self, obj):
-        language = self._get_language()
-        return obj.description_ar if language == 'ar' and obj.description_ar else obj.description
-
-    def get_hero_title(self, obj):
-        language = self._get_language()
-        return obj.hero_title_ar if language == 'ar' and obj.hero_title_ar else obj.hero_title
-
-    def get_sub_hero_title(self, obj):
-        language = self._get_language()
-        return obj.sub_hero_title_ar if language == 'ar' and obj.sub_hero_title_ar else obj.sub_hero_title
-
-    def get_hero_description(self, obj):
-        language = self._get_language()
-        return obj.hero_description_ar if language == 'ar' and obj.hero_description_ar else obj.hero_description
-
-    def _get_language(self):
-        request = self.context.get('request')
-        if request:
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-        return 'en'
-
 
 class ServiceDetailSerializer(serializers.ModelSerializer):
     features = ServiceFeatureSerializer(many=True, read_only=True)
@@ -244,11 +98,11 @@ class ServiceDetailSerializer(serializers.ModelSerializer):
     packages = PackageSerializer(many=True, read_only=True)
     addons = AddonSerializer(many=True, read_only=True)
     image_url = serializers.SerializerMethodField()
-    name = serializers.SerializerMethodField()
-    description = serializers.SerializerMethodField()
-    hero_title = serializers.SerializerMethodField()
-    sub_hero_title = serializers.SerializerMethodField()
-    hero_description = serializers.SerializerMethodField()
+    name = LocalizedField()
+    description = LocalizedField()
+    hero_title = LocalizedField()
+    sub_hero_title = LocalizedField()
+    hero_description = LocalizedField()
 
     class Meta:
         model = Service
@@ -265,36 +119,6 @@ class ServiceDetailSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
-    def get_name(self, obj):
-        language = self._get_language()
-        return obj.name_ar if language == 'ar' and obj.name_ar else obj.name
-
-    def get_description(self, obj):
-        language = self._get_language()
-        return obj.description_ar if language == 'ar' and obj.description_ar else obj.description
-
-    def get_hero_title(self, obj):
-        language = self._get_language()
-        return obj.hero_title_ar if language == 'ar' and obj.hero_title_ar else obj.hero_title
-
-    def get_sub_hero_title(self, obj):
-        language = self._get_language()
-        return obj.sub_hero_title_ar if language == 'ar' and obj.sub_hero_title_ar else obj.sub_hero_title
-
-    def get_hero_description(self, obj):
-        language = self._get_language()
-        return obj.hero_description_ar if language == 'ar' and obj.hero_description_ar else obj.hero_description
-
-    def _get_language(self):
-        request = self.context.get('request')
-        if request:
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-        return 'en'
 
 class BookingCreateSerializer(serializers.ModelSerializer):
     addon_ids = serializers.ListField(
@@ -312,35 +136,91 @@ class BookingCreateSerializer(serializers.ModelSerializer):
             'address', 'booking_date', 'special_requests'
         ]
 
+    def validate(self, data):
+        # Checked and priced with the same table as quotes
+        try:
+            quote = pricing.get_price_table(fresh=True).quote(
+                data['service'].pk, data['package'].pk, data.pop('addon_ids', [])
+            )
+        except pricing.PricingError as error:
+            raise serializers.ValidationError({error.field: error.message})
+
+        addons = []
+        if quote.addon_ids:
+            addons = list(
+                Addon.objects.filter(id__in=quote.addon_ids)
+                .select_related('category')
+                .order_by(*Addon._meta.ordering)
+            )
+
+        data['addons'] = addons
+        data['total_price'] = quote.total
+        return data
+
     def create(self, validated_data):
-        # Extract addon_ids first
-        addon_ids = validated_data.pop('addon_ids', [])
+        addons = validated_data.pop('addons')
+
+        booking = Booking(**validated_data)
+        booking.capture_items(validated_data['service'], validated_data['package'], addons)
+
+        with transaction.atomic():
+            try:
+                # Reserves the booking's slot in the same transaction
+                booking.save()
+            except capacity.SlotUnavailable:
+                raise serializers.ValidationError({'booking_date': 'This time slot is fully booked.'})
+            # Through rows in one INSERT; addons.set() would first read the existing ones
+            Booking.addons.through.objects.bulk_create([
+                Booking.addons.through(booking_id=booking.pk, addon_id=addon.pk)
+                for addon in addons
+            ])
+        return booking
 
-        # Get the addons objects
-        addons = Addon.objects.filter(id__in=addon_ids, is_active=True) if addon_ids else []
+# Unbound, only used to format prices like Booking.total_price and Addon.price
+_price = serializers.DecimalField(max_digits=10, decimal_places=2)
+_addon_price = serializers.DecimalField(max_digits=8, decimal_places=2)
 
-        # Calculate total price
-        package = validated_data['package']
-        total_price = package.price + sum(addon.price for addon in addons)
 
-        # Create booking
-        booking = Booking.objects.create(
-            **validated_data,
-            total_price=total_price
-        )
+class QuoteSerializer(serializers.Serializer):
+    """Validates a quote request; renders a ``pricing.Quote`` in the request language"""
+    service = serializers.IntegerField()
+    package = serializers.IntegerField()
+    addon_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        default=list
+    )
 
-        # Set many-to-many relationship after booking is created
-        if addons:
-            booking.addons.set(addons)
+    def validate(self, data):
+        try:
+            data['quote'] = pricing.get_price_table().quote(data['service'], data['package'], data['addon_ids'])
+        except pricing.PricingError as error:
+            raise serializers.ValidationError({error.field: error.message})
+        return data
+
+    def to_representation(self, instance):
+        language = context_language(self.context)
+        return {
+            'service': instance.service_id,
+            'package': instance.package_id,
+            'addon_ids': instance.addon_ids,
+            'lines': [
+                {
+                    'type': line['type'],
+                    'id': line['id'],
+                    'name': line['name'][language],
+                    'price': _price.to_representation(line['price']),
+                }
+                for line in instance.lines
+            ],
+            'total': _price.to_representation(instance.total),
+        }
 
-        return booking
 
 class BookingSerializer(serializers.ModelSerializer):
-    service_name = serializers.CharField(source='service.name', read_only=True)
-    service_type = serializers.CharField(source='service.service_type', read_only=True)
-    package_name = serializers.CharField(source='package.name', read_only=True)
-    package_price = serializers.DecimalField(source='package.price', read_only=True, max_digits=8, decimal_places=2)
-    addons_details = AddonSerializer(source='addons', many=True, read_only=True)
+    """Renders bookings from their own columns only, see ``Booking.capture_items()``"""
+    addons = serializers.SerializerMethodField()
+    addons_details = serializers.SerializerMethodField()
 
     class Meta:
         model = Booking
@@ -352,4 +232,28 @@ class BookingSerializer(serializers.ModelSerializer):
             'booking_date', 'special_requests', 'total_price',
             'status', 'created_at'
         ]
-        read_only_fields = ['status', 'created_at', 'total_price']
\ No newline at end of file
+        read_only_fields = ['status', 'created_at', 'total_price']
+
+    def get_addons(self, obj):
+        return [line['id'] for line in obj.addon_lines]
+
+    def get_addons_details(self, obj):
+        arabic = context_language(self.context) == 'ar'
+        details = []
+        for line in obj.addon_lines:
+            # Same shape as AddonSerializer, category_name only with a category
+            detail = {
+                'id': line['id'],
+                'name': (arabic and line['name_ar']) or line['name'],
+                'description': (arabic and line['description_ar']) or line['description'],
+                'category': line['category'],
+            }
+            if line['category'] is not None:
+                detail['category_name'] = line['category_name']
+            detail.update({
+                'price': _addon_price.to_representation(line['price']),
+                'is_active': line['is_active'],
+                'order': line['order'],
+            })
+            details.append(detail)
+        return details
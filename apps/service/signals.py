@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from apps.contact_us.models import ContactMethod, OfficeLocation
+from apps.settings.models import ContactInfo
+from . import catalog, prerender
+from .models import (
+    Service, ServiceFeature, ServiceContent, ServiceRating,
+    Package, Addon, AddonCategory, CatalogVersion, Booking, CapacitySlot
+)
+
+CATALOG_MODELS = (
+    Service, ServiceFeature, ServiceContent, ServiceRating,
+    Package, Addon, AddonCategory,
+)
+
+# Not part of the catalog snapshot, but published with it as pre-rendered files
+PRERENDERED_MODELS = CATALOG_MODELS + (ContactMethod, OfficeLocation, ContactInfo)
+
+
+def catalog_changed(sender, **kwargs):
+    """Publish a new catalog version so every worker rebuilds its snapshot"""
+    CatalogVersion.bump()
+    transaction.on_commit(catalog.expire_snapshot)
+    prerender.schedule_render()
+
+
+for model in PRERENDERED_MODELS:
+    post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_save_{model.__name__}')
+    post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_delete_{model.__name__}')
+
+
+def release_booking_slot(sender, instance, **kwargs):
+    """Deleting a booking frees its reserved slot"""
+    if instance.capacity_slot_id:
+        CapacitySlot.release(instance.capacity_slot_id)
+
+
+post_delete.connect(release_booking_slot, sender=Booking, dispatch_uid='booking_release_slot')
+
+
+def recapture_booking_addons(sender, instance, action, reverse, **kwargs):
+    """Re-snapshot the addon lines when a booking's addons are edited, e.g. in the admin"""
+    if reverse or action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    addons = instance.addons.select_related('category').order_by(*Addon._meta.ordering)
+    instance.addon_lines = [Booking.addon_line(addon) for addon in addons]
+    Booking.objects.filter(pk=instance.pk).update(addon_lines=instance.addon_lines)
+
+
+m2m_changed.connect(recapture_booking_addons, sender=Booking.addons.through, dispatch_uid='booking_addon_lines')
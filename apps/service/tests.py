@@ -1,3 +1,361 @@
-from django.test import TestCase
+import threading
+from contextlib import nullcontext
+from datetime import timedelta
+from unittest import SkipTest, mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from common.pagination import KeysetPagination
+from common.renderers import FastJSONRenderer
+from . import capacity
+from .capacity import SlotUnavailable
+from .models import (
+    Addon, AddonCategory, Booking, CapacitySlot, Package, Service, ServiceCapacity, ServiceContent,
+    ServiceFeature, ServiceRating,
+)
+from .projections import project_catalog
+from .serializers import BookingCreateSerializer, ServiceDetailSerializer, ServiceListSerializer
+
+
+def create_package(capacity=None):
+    service = Service.objects.create(name='Home Cleaning', description='Weekly', service_type='home_cleaning')
+    package = Package.objects.create(
+        service=service, name='Studio', square_feet='400', duration='2 hours', package_type='studio', price='150.00'
+    )
+    if capacity is not None:
+        ServiceCapacity.objects.create(service=service, slot_minutes=60, capacity=capacity)
+    return package
+
+
+def create_catalog(services=2):
+    """Services with two rows of every relation, half of them translated"""
+    category = AddonCategory.objects.create(name='Extras', name_ar='إضافات')
+    for index in range(services):
+        service = Service.objects.create(
+            name=f'Service {index}', name_ar=f'خدمة {index}' if index % 2 else '', description='Clean',
+            hero_title='Shine', sub_hero_title=None, service_type='deep_cleaning', start_price=100 + index,
+        )
+        for order in range(2):
+            arabic = 'عربي' if order else ''
+            ServiceFeature.objects.create(service=service, name=f'Feature {order}', name_ar=arabic, order=order)
+            ServiceContent.objects.create(service=service, name=f'Content {order}', name_ar=arabic, order=order)
+            ServiceRating.objects.create(
+                service=service, name=f'Rating {order}', description='Good', description_ar=arabic, order=order
+            )
+            Package.objects.create(
+                service=service, name=f'Package {order}', square_feet='800', duration='3 hours',
+                duration_ar=arabic, package_type='villa', price='250.50', order=order,
+            )
+            Addon.objects.create(
+                service=service, category=category if order else None, name=f'Addon {order}',
+                name_ar=arabic, price='40.00', order=order,
+            )
+
+
+def next_slot(hours=0):
+    start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=2)
+    return start + timedelta(hours=hours)
+
+
+def booking_data(package, booking_date):
+    return {
+        'service': package.service_id,
+        'package': package.pk,
+        'customer_name': 'Sara',
+        'customer_email': 'sara@example.com',
+        'customer_phone': '0501234567',
+        'address': 'Dubai Marina',
+        'booking_date': booking_date.isoformat(),
+    }
+
+
+class CatalogQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+
+    def test_list_plan_does_not_grow_with_the_catalog(self):
+        # Services, features and contents
+        with self.assertNumQueries(3):
+            ServiceListSerializer(Service.objects.for_list(), many=True).data
+        create_catalog(services=5)
+        with self.assertNumQueries(3):
+            ServiceListSerializer(Service.objects.for_list(), many=True).data
+
+    def test_detail_plan_does_not_grow_with_the_catalog(self):
+        # Plus ratings, packages and addons with their category
+        with self.assertNumQueries(6):
+            ServiceDetailSerializer(Service.objects.for_detail(), many=True).data
+        create_catalog(services=5)
+        with self.assertNumQueries(6):
+            ServiceDetailSerializer(Service.objects.for_detail(), many=True).data
+
+
+class CatalogProjectionTests(TestCase):
+    """project_catalog() has to render byte for byte what the serializers do"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(services=3)
+        first, second, third = Service.objects.order_by('pk')
+        Service.objects.filter(pk=second.pk).update(image='image/upload/v1712/hero.png')
+        Service.objects.filter(pk=third.pk).update(is_active=False)
+
+    def render(self, data):
+        return FastJSONRenderer().render(data).decode()
+
+    def test_projection_matches_the_serializers(self):
+        services = Service.objects.filter(is_active=True).for_detail()
+        for language in ('en', 'ar'):
+            with self.subTest(language=language):
+                context = {'language': language}
+                listing, details = project_catalog(language)
+
+                self.assertEqual(
+                    self.render(listing),
+                    self.render(ServiceListSerializer(services, many=True, context=context).data),
+                )
+                self.assertEqual(list(details), [service.pk for service in services])
+                for service in services:
+                    self.assertEqual(
+                        self.render(details[service.pk]),
+                        self.render(ServiceDetailSerializer(service, context=context).data),
+                    )
+
+
+class RendererParityTests(TestCase):
+    """FastJSONRenderer has to render byte for byte what JSONRenderer does"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(services=1)
+        Service.objects.update(description='Line\u2028break \u2029 "quoted" </script>', name_ar='خدمة')
+
+    def assertSameBytes(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_service_detail_payload(self):
+        service = Service.objects.for_detail().get()
+        for language in ('en', 'ar'):
+            with self.subTest(language=language):
+                self.assertSameBytes(ServiceDetailSerializer(service, context={'language': language}).data)
+
+    def test_types_handed_to_the_drf_encoder(self):
+        self.assertSameBytes({
+            'price': Package.objects.first().price,
+            'created_at': timezone.now(),
+            'booking_date': next_slot(),
+            'day': next_slot().date(),
+            'ids': Service.objects.values_list('pk', flat=True),
+            1: None,
+        })
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        package = create_package()
+        start = timezone.now()
+        for index in range(7):
+            booking = Booking.objects.create(
+                service=package.service, package=package, customer_name=f'Customer {index}',
+                customer_email=f'c{index}@example.com', customer_phone='0501234567', address='Dubai Marina',
+                booking_date=next_slot(hours=index),
+            )
+            Booking.objects.filter(pk=booking.pk).update(created_at=start + timedelta(minutes=index))
+        cls.package = package
+        cls.newest_first = list(Booking.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def paginate(self, link=None, **params):
+        """Booking pks of the page at ``link`` (or the first one) with its next and previous links"""
+        if link:
+            params = {name: values[0] for name, values in parse_qs(urlsplit(link).query).items()}
+        paginator = KeysetPagination()
+        paginator.page_size = 3
+        page = paginator.paginate_queryset(Booking.objects.all(), Request(APIRequestFactory().get('/', params)))
+        return [booking.pk for booking in page], paginator.get_next_link(), paginator.get_previous_link()
+
+    def test_next_and_previous_round_trip(self):
+        first, next_link, previous_link = self.paginate()
+        self.assertEqual(first, self.newest_first[:3])
+        self.assertIsNone(previous_link)
+
+        second, next_link, previous_link = self.paginate(next_link)
+        self.assertEqual(second, self.newest_first[3:6])
+        third, next_link, back_to_second = self.paginate(next_link)
+        self.assertEqual(third, self.newest_first[6:])
+        self.assertIsNone(next_link)
+
+        self.assertEqual(self.paginate(back_to_second)[0], second)
+        back, _, previous_link = self.paginate(previous_link)
+        self.assertEqual(back, first)
+        self.assertIsNone(previous_link)
+
+    def test_rows_inserted_between_pages_do_not_shift_the_next_page(self):
+        _, next_link, _ = self.paginate()
+        Booking.objects.create(
+            service=self.package.service, package=self.package, customer_name='Late', customer_email='l@example.com',
+            customer_phone='0501234567', address='Dubai Marina', booking_date=next_slot(hours=9),
+        )
+
+        self.assertEqual(self.paginate(next_link)[0], self.newest_first[3:6])
+
+    def test_created_at_ties_are_broken_by_id(self):
+        Booking.objects.update(created_at=timezone.now())
+
+        pages, link = [], None
+        while True:
+            page, link, _ = self.paginate(link)
+            pages += page
+            if not link:
+                break
+        self.assertEqual(pages, sorted(self.newest_first, reverse=True))
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ('garbage', 'eyJwIjpbXX0=', 'eyJwIjpbIm5vdCBhIGRhdGUiLDFdLCJyIjpmYWxzZX0='):
+            with self.subTest(cursor=cursor), self.assertRaises(NotFound):
+                self.paginate(cursor=cursor)
+
+    def test_page_size_is_capped(self):
+        paginator = KeysetPagination()
+        for requested, expected in (('2', 2), ('0', 1), ('x', paginator.page_size), ('100000', paginator.max_page_size)):
+            with self.subTest(requested=requested):
+                request = Request(APIRequestFactory().get('/', {'page_size': requested}))
+                self.assertEqual(paginator.get_page_size(request), expected)
+        request = Request(APIRequestFactory().get('/', {'page_size': '100000'}))
+        self.assertEqual(len(paginator.paginate_queryset(Booking.objects.all(), request)), len(self.newest_first))
+
+
+class BookingCapacityTests(TestCase):
+    def setUp(self):
+        self.package = create_package(capacity=1)
+
+    def create_booking(self, booking_date):
+        return Booking.objects.create(
+            service=self.package.service, package=self.package, customer_name='Sara',
+            customer_email='sara@example.com', customer_phone='0501234567', address='Dubai Marina',
+            booking_date=booking_date,
+        )
+
+    def used(self):
+        return dict(CapacitySlot.objects.values_list('starts_at', 'used'))
+
+    def test_booking_saved_outside_the_api_reserves_its_slot(self):
+        booking = self.create_booking(next_slot())
+
+        self.assertIsNotNone(booking.capacity_slot_id)
+        self.assertEqual(self.used(), {next_slot(): 1})
+        with self.assertRaises(SlotUnavailable):
+            self.create_booking(next_slot())
+
+    def test_moving_a_booking_moves_its_reservation(self):
+        booking = self.create_booking(next_slot())
+
+        booking.booking_date = next_slot(hours=2)
+        booking.save()
+
+        self.assertEqual(self.used(), {next_slot(): 0, next_slot(hours=2): 1})
+
+    def test_moving_into_a_full_slot_keeps_the_old_reservation(self):
+        self.create_booking(next_slot(hours=2))
+        booking = self.create_booking(next_slot())
+
+        held_slot = booking.capacity_slot_id
+
+        booking.booking_date = next_slot(hours=2)
+        with self.assertRaises(SlotUnavailable):
+            booking.save()
+
+        self.assertEqual(self.used(), {next_slot(): 1, next_slot(hours=2): 1})
+        self.assertEqual(booking.capacity_slot_id, held_slot)
+
+        # Saving it back in place keeps the reservation, cancelling frees it
+        booking.booking_date = next_slot()
+        booking.save()
+        booking.refresh_from_db()
+        self.assertEqual(booking.capacity_slot_id, held_slot)
+        booking.status = 'cancelled'
+        booking.save()
+        self.assertEqual(self.used(), {next_slot(): 0, next_slot(hours=2): 1})
+
+    def test_reserve_retries_when_another_booking_creates_the_slot_first(self):
+        ServiceCapacity.objects.update(capacity=2)
+        rule = ServiceCapacity.objects.get()
+        create = CapacitySlot.objects.create
+
+        def create_after_another_booking(**fields):
+            create(**fields)
+            raise IntegrityError('UNIQUE constraint failed')
+
+        # The savepoint would roll the competing row back with the error
+        with mock.patch.object(capacity.transaction, 'atomic', nullcontext), \
+                mock.patch.object(CapacitySlot.objects, 'create', side_effect=create_after_another_booking):
+            slot_id = capacity.reserve(rule, next_slot())
+
+        self.assertEqual(CapacitySlot.objects.get().pk, slot_id)
+        self.assertEqual(self.used(), {next_slot(): 2})
+
+    def test_cancelling_and_reinstating_a_booking(self):
+        booking = self.create_booking(next_slot())
+
+        booking.status = 'cancelled'
+        booking.save(update_fields=['status'])
+        self.assertEqual(self.used(), {next_slot(): 0})
+
+        booking.status = 'pending'
+        booking.save(update_fields=['status'])
+        self.assertEqual(self.used(), {next_slot(): 1})
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    THREADS = 10
+    CAPACITY = 3
+
+    @classmethod
+    def setUpClass(cls):
+        # Each thread opens its own connection, which can't see an in-memory database
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise SkipTest('The test database is in memory')
+        super().setUpClass()
+
+    def test_concurrent_bookings_never_oversubscribe_a_slot(self):
+        package = create_package(capacity=self.CAPACITY)
+        data = booking_data(package, next_slot())
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def book():
+            try:
+                serializer = BookingCreateSerializer(data=data)
+                serializer.is_valid(raise_exception=True)
+                barrier.wait()
+                try:
+                    serializer.save()
+                    results.append('booked')
+                except ValidationError as error:
+                    results.append(str(error.detail['booking_date']))
+                except Exception as error:
+                    results.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count('booked'), self.CAPACITY)
+        self.assertEqual(
+            [result for result in results if result != 'booked'],
+            ['This time slot is fully booked.'] * (self.THREADS - self.CAPACITY)
+        )
+        self.assertEqual(Booking.objects.count(), self.CAPACITY)
+        self.assertEqual(CapacitySlot.objects.get().used, self.CAPACITY)
@@ -1,10 +1,15 @@
 from django.urls import path
-from .views import (ServiceListAPIView, ServiceDetailAPIView, BookingCreateAPIView)
+from .views import (
+    ServiceListAPIView, ServiceDetailAPIView, ServiceAvailabilityAPIView, QuoteAPIView, BookingCreateAPIView
+)
 
 urlpatterns = [
     # Services
     path('services/', ServiceListAPIView.as_view(), name='service-list'),
     path('services/<int:pk>/', ServiceDetailAPIView.as_view(), name='service-detail'),
+    path('services/<int:pk>/availability/', ServiceAvailabilityAPIView.as_view(), name='service-availability'),
+    # Pricing
+    path('quote/', QuoteAPIView.as_view(), name='quote'),
     # Bookings
     path('bookings/', BookingCreateAPIView.as_view(), name='booking-list-create'),
 ]
@@ -1,34 +1,110 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.shortcuts import get_object_or_404
-from .models import Service, Booking
-from .serializers import (
-    ServiceListSerializer, ServiceDetailSerializer,
-    BookingSerializer, BookingCreateSerializer
-)
-from django.db.models import Q
+from common.conditional import conditional_get
+from common.idempotency import idempotent
+from common.localization import resolve_language
+from common.pagination import KeysetPagination
+from common.streaming import stream_json, wants_stream
+from . import capacity, catalog, prerender
+from .models import Booking
+from .serializers import BookingSerializer, BookingCreateSerializer, QuoteSerializer
 
 
 class ServiceListAPIView(APIView):
     @classmethod
+    @conditional_get(catalog.response_version)
     def get(cls, request):
+        # Served from the pre-rendered file or the worker's catalog snapshot
         service_type = request.GET.get('service_type')
-        queryset = Service.objects.filter(is_active=True)
-
-        if service_type:
-            queryset = queryset.filter(service_type=service_type)
+        language = resolve_language(request)
+        response = prerender.prerendered_response(request, prerender.service_list_key(language, service_type))
+        if response is not None:
+            return response
 
-        serializer = ServiceListSerializer(queryset, many=True, context={'request': request})
-        return Response(serializer.data)
+        snapshot = catalog.get_snapshot()
+        return Response(snapshot.service_list(language, service_type))
 
 
 class ServiceDetailAPIView(APIView):
     @classmethod
+    @conditional_get(catalog.response_version)
     def get(cls, request, pk):
-        service = get_object_or_404(Service, pk=pk, is_active=True)
-        serializer = ServiceDetailSerializer(service, context={'request': request})
-        return Response(serializer.data)
+        language = resolve_language(request)
+        response = prerender.prerendered_response(request, prerender.service_detail_key(language, pk))
+        if response is not None:
+            return response
+
+        snapshot = catalog.get_snapshot()
+        return Response(snapshot.service_detail(language, pk))
+
+
+class ServiceAvailabilityAPIView(APIView):
+    # Days returned without ?to=, and the widest window accepted
+    DEFAULT_DAYS = 30
+    MAX_DAYS = 90
+
+    @classmethod
+    def get(cls, request, pk):
+        # Unknown or inactive services 404 straight from the catalog snapshot
+        catalog.get_snapshot().service_detail(resolve_language(request), pk)
+
+        try:
+            start = cls._parse_date(request.GET.get('from'), timezone.localdate())
+            end = cls._parse_date(request.GET.get('to'), start + timedelta(days=cls.DEFAULT_DAYS - 1))
+            package = int(request.GET['package']) if request.GET.get('package') else None
+        except ValueError:
+            return Response(
+                {"detail": "from and to must be dates (YYYY-MM-DD), package a package id."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 0 <= (end - start).days < cls.MAX_DAYS:
+            return Response(
+                {"detail": f"to must be on or after from, at most {cls.MAX_DAYS} days apart."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        data = {
+            'service': pk, 'package': package, 'from': start.isoformat(), 'to': end.isoformat(),
+            'slot_minutes': None, 'capacity': None, 'days': [],
+        }
+        rule = capacity.capacity_for(pk, package)
+        if rule is not None:
+            data.update({
+                'slot_minutes': rule.slot_minutes,
+                'capacity': rule.capacity,
+                'days': capacity.availability_calendar(
+                    rule,
+                    timezone.make_aware(datetime.combine(start, time.min)),
+                    timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+                ),
+            })
+        return Response(data)
+
+    @staticmethod
+    def _parse_date(value, default):
+        if not value:
+            return default
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValueError(value)
+        return parsed
+
+
+class QuoteAPIView(APIView):
+    @classmethod
+    def post(cls, request):
+        # Priced from the worker's price table, no database access when warm
+        serializer = QuoteSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            quote = serializer.validated_data['quote']
+            return Response(QuoteSerializer(quote, context={'request': request}).data)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
 
 class BookingCreateAPIView(APIView):
     @classmethod
@@ -40,20 +116,32 @@ class BookingCreateAPIView(APIView):
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
-        # Get email filter from query parameters
+        # Customer filters, matched on the normalized lookup columns. A full
+        # address is looked up exactly, anything else as a prefix by default.
         email = request.GET.get('email', None)
-        bookings = Booking.objects.all().order_by('-created_at')
-
-        if email:
-            bookings = bookings.filter(
-                Q(customer_email__iexact=email) |
-                Q(customer_email__icontains=email)
+        phone = request.GET.get('phone', None)
+        match = request.GET.get('match') or ('exact' if email and '@' in email else 'prefix')
+        if match not in Booking.CUSTOMER_MATCHES:
+            return Response(
+                {"match": f"Must be one of: {', '.join(Booking.CUSTOMER_MATCHES)}."},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-        serializer = BookingSerializer(bookings, many=True)
-        return Response(serializer.data)
+        bookings = Booking.objects.all()
+        if email or phone:
+            bookings = bookings.search_customer(email=email, phone=phone, match=match)
+
+        # Staff tooling exporting full result sets streams them instead of paging
+        if wants_stream(request):
+            return stream_json(bookings, lambda page: BookingSerializer(page, many=True).data)
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(bookings, request)
+        serializer = BookingSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @classmethod
+    @idempotent
     def post(cls, request):
         serializer = BookingCreateSerializer(data=request.data)
         if serializer.is_valid():
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from common.exports import ExportCsvMixin
 from .models import ContactInfo, NewsletterSubscriber
 
 
@@ -32,6 +33,7 @@ class ContactInfoAdmin(admin.ModelAdmin):
 
 
 @admin.register(NewsletterSubscriber)
-class NewsletterSubscriberAdmin(admin.ModelAdmin):
+class NewsletterSubscriberAdmin(ExportCsvMixin, admin.ModelAdmin):
     list_display = ['email']
     search_fields = ['email']
+    export_fields = ('id', 'email', 'created_at')
@@ -0,0 +1,17 @@
+# Generated by Django 6.0a1 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('settings', '0002_contactinfo_address_ar_contactinfo_building_ar_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='newslettersubscriber',
+            index=models.Index(fields=['created_at', 'id'], name='newsletter_created_id_idx'),
+        ),
+    ]
@@ -69,6 +69,9 @@ class NewsletterSubscriber(BaseModel):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='newsletter_created_id_idx'),
+        ]
 
     def __str__(self):
         return self.email
@@ -1,10 +1,17 @@
 from rest_framework import serializers
 from .models import ContactInfo, NewsletterSubscriber
+from common.localization import LocalizedField, context_language
 
 from rest_framework import serializers
 
 
 class ContactInfoSerializer(serializers.ModelSerializer):
+    company_name = LocalizedField()
+    tagline = LocalizedField()
+    address = LocalizedField()
+    building = LocalizedField()
+    office = LocalizedField()
+    copyright_text = LocalizedField()
     working_hours = serializers.SerializerMethodField()
     address_full = serializers.SerializerMethodField()
 
@@ -33,9 +40,7 @@ class ContactInfoSerializer(serializers.ModelSerializer):
         ]
 
     def get_working_hours(self, obj):
-        language = self._get_language()
-
-        if language == 'ar':
+        if context_language(self.context) == 'ar':
             return {
                 'monday_friday': obj.mon_fri_hours_ar,
                 'saturday': obj.saturday_hours_ar,
@@ -49,47 +54,11 @@ class ContactInfoSerializer(serializers.ModelSerializer):
             }
 
     def get_address_full(self, obj):
-        language = self._get_language()
-
-        if language == 'ar':
+        if context_language(self.context) == 'ar':
             return f"{obj.address_ar}, {obj.building_ar}, {obj.office_ar}"
         else:
             return f"{obj.address}, {obj.building}, {obj.office}"
 
-    def _get_language(self):
-        """Extract language from request query parameters or headers"""
-        request = self.context.get('request')
-        if request:
-            # Check query parameter first
-            lang = request.query_params.get('lang', '').lower()
-            if lang in ['ar', 'en']:
-                return lang
-
-            # Check Accept-Language header
-            accept_language = request.META.get('HTTP_ACCEPT_LANGUAGE', '')
-            if 'ar' in accept_language.lower():
-                return 'ar'
-
-        return 'en'  # Default to English
-
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        language = self._get_language()
-
-        if language == 'ar':
-            # Replace all English text fields with Arabic equivalents
-            arabic_fields = {
-                'company_name': instance.company_name_ar,
-                'tagline': instance.tagline_ar,
-                'address': instance.address_ar,
-                'building': instance.building_ar,
-                'office': instance.office_ar,
-                'copyright_text': instance.copyright_text_ar,
-            }
-            data.update(arabic_fields)
-
-        return data
-
 class NewsletterSubscriberSerializer(serializers.ModelSerializer):
     class Meta:
         model = NewsletterSubscriber
@@ -101,3 +70,9 @@ class NewsletterSubscriberSerializer(serializers.ModelSerializer):
             email=email
         )
         return subscriber
+
+
+class NewsletterSubscriberListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NewsletterSubscriber
+        fields = ['id', 'email', 'created_at']
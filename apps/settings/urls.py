@@ -1,8 +1,9 @@
 from django.urls import path
 
-from .views import ContactInfoViewSet
+from .views import ContactInfoViewSet, NewsletterSubscriberListView
 
 urlpatterns = [
     path('contact-info/', ContactInfoViewSet.as_view({"get": "list"}), name='contact-info'),
+    path('newsletter-subscribers/', NewsletterSubscriberListView.as_view(), name='newsletter-subscriber-list'),
 
 ]
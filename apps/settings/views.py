@@ -1,8 +1,13 @@
-from rest_framework import viewsets, status
+from rest_framework import generics, permissions, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import ContactInfo
-from .serializers import ContactInfoSerializer, NewsletterSubscriberSerializer
+from .models import ContactInfo, NewsletterSubscriber
+from .serializers import ContactInfoSerializer, NewsletterSubscriberSerializer, NewsletterSubscriberListSerializer
+from apps.service import catalog, prerender
+from common.conditional import conditional_get
+from common.localization import resolve_language, for_language
+from common.pagination import KeysetPagination
+from common.streaming import StreamingListMixin
 
 
 class ContactInfoViewSet(viewsets.ViewSet):
@@ -10,15 +15,21 @@ class ContactInfoViewSet(viewsets.ViewSet):
     ViewSet for contact information with multilingual support
     """
 
+    @conditional_get(catalog.response_version)
     def list(self, request):
         """
         Get contact information
         Supports language parameter: ?lang=en or ?lang=ar
         Also supports Accept-Language header
         """
+        language = resolve_language(request)
+        response = prerender.prerendered_response(request, prerender.settings_contact_info_key(language))
+        if response is not None:
+            return response
+
         try:
             # Try to get existing contact info
-            contact_info = ContactInfo.objects.first()
+            contact_info = for_language(ContactInfo.objects.all(), language).first()
 
             # If none exists, create default one
             if not contact_info:
@@ -55,3 +66,11 @@ class ContactInfoViewSet(viewsets.ViewSet):
                     status=status.HTTP_500_INTERNAL_SERVER_ERROR
                 )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class NewsletterSubscriberListView(StreamingListMixin, generics.ListAPIView):
+    """Newsletter subscribers for staff, newest first; ``?stream=1`` for all of them"""
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = NewsletterSubscriberListSerializer
+    pagination_class = KeysetPagination
+    queryset = NewsletterSubscriber.objects.all()
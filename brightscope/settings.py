@@ -14,6 +14,7 @@ import environ
 from pathlib import Path
 import dj_database_url
 from datetime import timedelta
+from corsheaders.defaults import default_headers
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api  # Add these imports
@@ -54,6 +55,7 @@ INSTALLED_APPS = [
     'apps.service',
     'apps.settings',
     'apps.payments',
+    'common',
 
 ]
 
@@ -99,6 +101,11 @@ if ENVIRONMENT.lower() == "local":
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            # Write transactions take the lock upfront instead of failing
+            # with "database is locked" when two of them upgrade at once
+            "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 20},
+            # A file, so the threaded tests' connections share the database
+            "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
         }
     }
 else:
@@ -149,6 +156,11 @@ STATIC_URL = "static/"
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# Far-future caching for hashed static files and the pre-rendered API files
+WHITENOISE_IMMUTABLE_FILE_TEST = r"^.+\.[0-9a-f]{12}\..+$"
+# Write anonymous API responses to STATIC_ROOT/api when a web dyno boots
+# (python manage.py prerender_api, see Procfile)
+PRERENDER_API = env.bool("PRERENDER_API", default=ENVIRONMENT.lower() != "local")
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
@@ -162,7 +174,40 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'common.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'common.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Keyset pagination of the growing collections (bookings, submissions, subscribers)
+API_PAGE_SIZE = env.int("API_PAGE_SIZE", default=50)
+API_MAX_PAGE_SIZE = env.int("API_MAX_PAGE_SIZE", default=200)
+# Rows serialized per chunk by ?stream=1 list responses
+API_STREAM_CHUNK_SIZE = env.int("API_STREAM_CHUNK_SIZE", default=500)
+
+# Idempotency-Key responses are kept in the common.IdempotencyKey table, whose
+# expired rows `manage.py purge_idempotency_keys` deletes (run it on a schedule)
+IDEMPOTENCY_KEY_TTL = env.int("IDEMPOTENCY_KEY_TTL", default=24 * 60 * 60)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Short-lived keys every worker coordinates on: gateway bulkhead slots,
+    # verification and Idempotency-Key locks. A table of its own keeps it to a handful of rows, as
+    # the database cache counts the whole table on every add().
+    "coordination": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "coordination_cache",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    },
 }
 
 # Email settings
@@ -204,6 +249,37 @@ PAYTABS_SERVER_KEY = os.getenv("PAYTABS_SERVER_KEY")
 PAYTABS_BASE_URL = os.getenv("PAYTABS_BASE_URL", "https://secure.paytabs.com")
 PAYTABS_CALLBACK_PATH = os.getenv("PAYTABS_CALLBACK_PATH")
 PAYTABS_RETURN_PATH = os.getenv("PAYTABS_RETURN_PATH")
+# Gateway client: per-call timeouts, keep-alive pool size, and retries for
+# idempotent calls (payment/query) only
+PAYTABS_CONNECT_TIMEOUT = env.float("PAYTABS_CONNECT_TIMEOUT", default=3.05)
+PAYTABS_READ_TIMEOUT = env.float("PAYTABS_READ_TIMEOUT", default=15)
+PAYTABS_POOL_SIZE = env.int("PAYTABS_POOL_SIZE", default=10)
+PAYTABS_QUERY_RETRIES = env.int("PAYTABS_QUERY_RETRIES", default=2)
+# Gateway calls in flight at once across the whole fleet, so a slow gateway
+# can't take every worker: from web dynos, and from callback workers in a pool
+# of their own. Size them for every dyno (e.g. half of web dynos times
+# WEB_CONCURRENCY); 0 leaves the calls uncapped.
+PAYTABS_MAX_CONCURRENCY = env.int("PAYTABS_MAX_CONCURRENCY", default=0)
+PAYTABS_WORKER_MAX_CONCURRENCY = env.int("PAYTABS_WORKER_MAX_CONCURRENCY", default=0)
+# Seconds a call waits for a free slot before failing with BulkheadFull
+PAYTABS_BULKHEAD_WAIT = env.float("PAYTABS_BULKHEAD_WAIT", default=2)
+# A cache every worker shares, for bulkhead slots and verification locks
+PAYTABS_SHARED_CACHE = "coordination"
+# Consecutive failures that open the circuit, and seconds before a trial call
+PAYTABS_BREAKER_FAILURES = env.int("PAYTABS_BREAKER_FAILURES", default=5)
+PAYTABS_BREAKER_RESET_TIMEOUT = env.int("PAYTABS_BREAKER_RESET_TIMEOUT", default=30)
+
+# l2met metric lines (common.metrics) go to stdout for the log drain
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "metrics": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
 
 # Jazzmin settings (modern admin interface)
 JAZZMIN_SETTINGS = {
@@ -224,7 +300,8 @@ JAZZMIN_UI_TWEAKS = {
 
 AUTH_USER_MODEL = 'account.User'
 CORS_ALLOW_CREDENTIALS = True
-CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken']
+CORS_EXPOSE_HEADERS = ['Content-Type', 'X-CSRFToken', 'Idempotent-Replayed']
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
 CORS_ALLOWED_ORIGINS = [
     "https://bright-scope-2c6c515b6aa6.herokuapp.com",
 ]
@@ -0,0 +1,44 @@
+import functools
+import hashlib
+
+from django.utils.cache import get_conditional_response
+
+from common.localization import resolve_language
+
+
+def get_etag(request, version):
+    """Weak ETag for the response to ``request`` rendered from data at ``version``"""
+    key = '|'.join((
+        request.path,
+        request.META.get('QUERY_STRING', ''),
+        resolve_language(request),
+        str(version),
+    ))
+    return 'W/"%s"' % hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def conditional_get(version):
+    """
+    Decorator for read-only API handlers answering ``304 Not Modified``
+    before any serialization happens.
+
+    ``version(request, *args, **kwargs)`` returns the version of the data
+    the handler renders its body from, e.g. the catalog version its snapshot
+    or pre-rendered files were built for. It is read before the handler
+    runs, so a body is never older than the ETag sent with it.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            etag = get_etag(request, version(request, *args, **kwargs))
+
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = handler(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,109 @@
+"""
+Streaming CSV exports for the admin.
+
+``ExportCsvMixin`` adds an "Export CSV" button to the changelist, exporting
+the current filtered and searched queryset, and an action exporting the
+selected rows. Rows are read as ``values_list`` tuples through a chunked
+iterator and written as they come, so memory stays flat and the first bytes
+go out before the whole table has been read.
+"""
+import csv
+import re
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+CHUNK_SIZE = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+# Spreadsheet apps evaluate cells starting with these as formulas; numbers
+# such as E.164 phones or negative amounts are left alone
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+_NUMBER = re.compile(r'[+-]?[\d .]+')
+
+
+class _Echo:
+    """File-like object handing each CSV line back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value, tz):
+    if isinstance(value, str):
+        if value.startswith(_FORMULA_PREFIXES) and not _NUMBER.fullmatch(value):
+            return f"'{value}"
+    elif isinstance(value, datetime):
+        return value.astimezone(tz).isoformat(sep=' ', timespec='seconds')
+    return value
+
+
+class ExportCsvMixin:
+    """
+    For ``ModelAdmin`` classes. ``export_fields`` lists the ``values_list``
+    lookups written as columns (headed by the lookup names);
+    ``export_formatters`` maps a lookup to a callable formatting its value.
+    """
+    export_fields = ()
+    export_formatters = {}
+    export_chunk_size = CHUNK_SIZE
+    change_list_template = 'admin/export_change_list.html'
+    actions = ['export_selected_csv']
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path(
+                'export/',
+                self.admin_site.admin_view(self.export_view),
+                name=f'{opts.app_label}_{opts.model_name}_export',
+            ),
+        ] + super().get_urls()
+
+    def export_view(self, request):
+        """The changelist as CSV, with the same filters, search and ordering"""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        try:
+            changelist = self.get_changelist_instance(request)
+        except IncorrectLookupParameters:
+            opts = self.model._meta
+            return HttpResponseRedirect(reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'))
+        return self.export_csv_response(changelist.get_queryset(request))
+
+    @admin.action(description=_('Export selected rows as CSV'), permissions=['view'])
+    def export_selected_csv(self, request, queryset):
+        return self.export_csv_response(queryset)
+
+    def export_csv_response(self, queryset):
+        filename = f'{self.model._meta.model_name}-{timezone.localtime():%Y%m%d-%H%M%S}.csv'
+        response = StreamingHttpResponse(self._csv_chunks(queryset), content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def _csv_chunks(self, queryset):
+        writer = csv.writer(_Echo())
+        formatters = [self.export_formatters.get(field) for field in self.export_fields]
+        tz = timezone.get_current_timezone()
+        # The BOM makes Excel read the file (and Arabic text in it) as UTF-8
+        yield '\ufeff' + writer.writerow(self.export_fields)
+
+        lines = []
+        rows = queryset.values_list(*self.export_fields).iterator(chunk_size=self.export_chunk_size)
+        for row in rows:
+            lines.append(writer.writerow([
+                _cell(formatter(value) if formatter else value, tz)
+                for formatter, value in zip(formatters, row)
+            ]))
+            if len(lines) == self.export_chunk_size:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
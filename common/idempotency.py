@@ -0,0 +1,111 @@
+"""
+``Idempotency-Key`` support for POST endpoints that clients retry.
+
+The first request with a given key runs the view and stores its response
+(with a fingerprint of the request) as an ``IdempotencyKey`` row for
+``IDEMPOTENCY_KEY_TTL`` seconds. Retries with the same key get the stored
+response back without running the view again. A retry arriving while the
+first request is still running waits for it behind a per-key lock taken with
+``cache.add`` on the shared ``coordination`` cache, so the work is only ever
+done once. Expired rows are deleted by ``manage.py purge_idempotency_keys``.
+"""
+import functools
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from common.models import IdempotencyKey
+
+CACHE_ALIAS = 'coordination' if 'coordination' in settings.CACHES else 'default'
+KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+# Locks outlive the slowest request, and expire if a worker dies holding one
+LOCK_TIMEOUT = getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)
+# How long a concurrent duplicate waits for the first request before a 409
+WAIT_TIMEOUT = getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 10)
+POLL_INTERVAL = 0.1
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256()
+    for part in (request.method, request.content_type or '', request.body):
+        digest.update(part if isinstance(part, bytes) else part.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _stored(scope):
+    return IdempotencyKey.objects.filter(scope=scope, expires_at__gt=timezone.now()).first()
+
+
+def _replay(stored, fingerprint):
+    if stored.fingerprint != fingerprint:
+        return Response(
+            {"detail": "This Idempotency-Key was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    return Response(stored.data, status=stored.status, headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(handler):
+    """
+    Decorator for API handlers (``handler(view, request, ...)``) honouring an
+    ``Idempotency-Key`` header. Requests without one run as usual. Keys are
+    scoped to the path and the authenticated user. Server errors are not
+    stored, so the client can retry them.
+    """
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return handler(view, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"detail": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cache = caches[CACHE_ALIAS]
+        user_id = getattr(request.user, 'pk', None) or ''
+        scope = hashlib.sha256(f'{request.path}|{user_id}|{key}'.encode()).hexdigest()
+        lock_key = f'idempotency:lock:{scope}'
+        fingerprint = _fingerprint(request)
+
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while not cache.add(lock_key, fingerprint, LOCK_TIMEOUT):
+            stored = _stored(scope)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+            if time.monotonic() >= deadline:
+                return Response(
+                    {"detail": "A request with this Idempotency-Key is still being processed."},
+                    status=status.HTTP_409_CONFLICT,
+                    headers={'Retry-After': '1'}
+                )
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            # The request holding the lock before us may have just finished
+            stored = _stored(scope)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code < 500 and hasattr(response, 'data'):
+                # An expired row for the scope may not have been purged yet
+                IdempotencyKey.objects.update_or_create(scope=scope, defaults={
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                    'expires_at': timezone.now() + timedelta(seconds=KEY_TTL),
+                })
+            return response
+        finally:
+            cache.delete(lock_key)
+    return wrapper
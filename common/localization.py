@@ -0,0 +1,121 @@
+from django.db.models import F, TextField, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils.translation.trans_real import parse_accept_lang_header
+from rest_framework import serializers
+
+SUPPORTED_LANGUAGES = ('en', 'ar')
+DEFAULT_LANGUAGE = 'en'
+
+# Attribute used to memoize the resolved language on the Django request
+_LANGUAGE_ATTR = '_api_language'
+
+
+def resolve_language(request):
+    """
+    Return the API language for a request, resolving it only once.
+
+    Order of precedence: ``?lang=`` query parameter, the highest-quality
+    supported ``Accept-Language`` entry, then the language picked by
+    ``LocaleMiddleware``. Falls back to English.
+    """
+    if request is None:
+        return DEFAULT_LANGUAGE
+
+    # DRF wraps the Django request; cache on the underlying one so every
+    # serializer, view and decorator of the same request shares the result
+    request = getattr(request, '_request', request)
+    language = getattr(request, _LANGUAGE_ATTR, None)
+    if language is None:
+        language = _parse_request_language(request)
+        setattr(request, _LANGUAGE_ATTR, language)
+    return language
+
+
+def _parse_request_language(request):
+    lang = request.GET.get('lang', '').lower()
+    if lang in SUPPORTED_LANGUAGES:
+        return lang
+
+    # Entries come back sorted by q-value, highest first
+    for code, _quality in parse_accept_lang_header(request.META.get('HTTP_ACCEPT_LANGUAGE', '')):
+        code = code.split('-')[0]
+        if code in SUPPORTED_LANGUAGES:
+            return code
+
+    code = getattr(request, 'LANGUAGE_CODE', '').split('-')[0].lower()
+    if code in SUPPORTED_LANGUAGES:
+        return code
+
+    return DEFAULT_LANGUAGE
+
+
+def context_language(context):
+    """Language for a serializer context: an explicit ``language`` wins over the request"""
+    language = context.get('language')
+    if language in SUPPORTED_LANGUAGES:
+        return language
+    return resolve_language(context.get('request'))
+
+
+def localized_expression(field, language):
+    """SQL expression for the value ``LocalizedField`` renders for ``field``"""
+    if language == 'ar':
+        # Translations are not always the same field type as the English column
+        return Coalesce(NullIf(f'{field}_ar', Value('')), field, output_field=TextField())
+    return F(field)
+
+
+def translated_fields(model):
+    """``(field, field_ar)`` name pairs of a model's translated columns"""
+    names = [field.name for field in model._meta.concrete_fields]
+    return [(name[:-3], name) for name in names if name.endswith('_ar') and name[:-3] in names]
+
+
+def for_language(queryset, language):
+    """
+    Defer the translated columns a ``language`` response does not render.
+
+    English never reads the ``*_ar`` columns. Arabic only reads the English
+    column to fall back from an empty Arabic one, so it is deferred when the
+    Arabic column is required; rows that are empty anyway load it lazily.
+    """
+    model = queryset.model
+    if language == 'ar':
+        deferred = [
+            field for field, field_ar in translated_fields(model)
+            if not model._meta.get_field(field_ar).blank
+        ]
+    else:
+        deferred = [field_ar for _field, field_ar in translated_fields(model)]
+    return queryset.defer(*deferred) if deferred else queryset
+
+
+class LocalizedField(serializers.Field):
+    """
+    Read-only field that maps a ``<source>_ar`` column onto ``<source>``.
+
+    Arabic requests get the Arabic column when it is filled in, everything
+    else gets the English one. The language is looked up once per field
+    instance, i.e. once per serialized response rather than once per row.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self._language = None
+
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        self.source_ar = f'{self.source}_ar'
+
+    def get_attribute(self, instance):
+        if self._language is None:
+            self._language = context_language(self.context)
+        if self._language == 'ar':
+            value = getattr(instance, self.source_ar)
+            if value:
+                return value
+        return getattr(instance, self.source)
+
+    def to_representation(self, value):
+        return value
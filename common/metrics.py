@@ -0,0 +1,24 @@
+"""
+Metrics as l2met log lines (``measure#paytabs.payment_query=41.2ms``).
+
+Heroku log drains and most log-based metric pipelines aggregate these
+without an agent, so emitting a metric is just a log call on the
+``metrics`` logger.
+"""
+import logging
+
+logger = logging.getLogger('metrics')
+
+
+def emit(measure=None, count=None, sample=None, **tags):
+    """
+    Log one line of metrics: ``measure`` maps names to milliseconds,
+    ``count`` to increments and ``sample`` to gauge values. ``tags`` are
+    appended as plain ``key=value`` pairs.
+    """
+    parts = []
+    parts.extend(f'measure#{name}={value:.1f}ms' for name, value in (measure or {}).items())
+    parts.extend(f'count#{name}={value}' for name, value in (count or {}).items())
+    parts.extend(f'sample#{name}={value}' for name, value in (sample or {}).items())
+    parts.extend(f'{key}={value}' for key, value in tags.items())
+    logger.info(' '.join(parts))
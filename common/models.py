@@ -0,0 +1,20 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response stored for an ``Idempotency-Key`` (see ``common.idempotency``).
+
+    Rows past ``expires_at`` are ignored and deleted by the
+    ``purge_idempotency_keys`` command.
+    """
+    # sha256 of the path, user and key
+    scope = models.CharField(max_length=64, primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+    status = models.PositiveSmallIntegerField()
+    data = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.scope
@@ -0,0 +1,172 @@
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Defaults for every keyset-paginated endpoint, overridable from settings
+PAGE_SIZE = getattr(settings, 'API_PAGE_SIZE', 50)
+MAX_PAGE_SIZE = getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination for collections that grow without bound.
+
+    Pages are sought with ``WHERE (created_at, id) < (last seen)`` on the
+    ``ordering`` columns instead of an OFFSET, so every page costs the same
+    and rows inserted meanwhile never shift or repeat entries. Cursors are
+    opaque base64 tokens; models should carry a composite index matching
+    ``ordering``.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = PAGE_SIZE
+    max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self._flip(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._seek(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        # Moving backwards from a cursor means there is a page after this one
+        self.has_next = position is not None if reverse else has_more
+        self.has_previous = has_more if reverse else position is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': reverse}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        """``(position, reverse)`` from the request cursor, ``(None, False)`` without one"""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+            position = [
+                self._field(field).to_python(value)
+                for field, value in zip(self.ordering, payload['p'], strict=True)
+            ]
+            return position, bool(payload['r'])
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _field(self, ordering):
+        return self.model._meta.get_field(ordering.lstrip('-'))
+
+    def _position(self, instance):
+        return [
+            self._field(field).value_to_string(instance)
+            for field in self.ordering
+        ]
+
+    def _seek(self, position, reverse):
+        """Rows strictly after ``position`` in (optionally reversed) ``ordering``"""
+        conditions, equal = [], Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            conditions.append(equal & Q(**{f'{name}__{lookup}': value}))
+            equal &= Q(**{name: value})
+        return reduce(or_, conditions)
+
+    @staticmethod
+    def _flip(ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin paginator reading the planner's row estimate for unfiltered
+    querysets on PostgreSQL instead of running ``COUNT(*)`` over the table.
+    Filtered querysets, small tables and other databases are counted
+    exactly. Pair with ``show_full_result_count = False``.
+    """
+    # Below this the estimate is not worth its inaccuracy
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = self._estimated_count()
+        if estimate is not None and estimate > self.exact_count_threshold:
+            return estimate
+        return super().count
+
+    def _estimated_count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql' or queryset.query.where:
+            return None
+        with connection.cursor() as cursor:
+            # reltuples is -1 until the table is first analyzed
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return row[0] if row and row[0] >= 0 else None
@@ -0,0 +1,35 @@
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib json renderer
+    orjson = None
+
+# Types orjson can't encode natively (Decimal, lazy strings, querysets...) and
+# datetimes are handed to DRF's encoder so the output matches JSONRenderer
+_ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+_encoder = encoders.JSONEncoder()
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    Drop-in ``JSONRenderer`` backed by orjson.
+
+    Produces the same bytes as DRF's renderer for compact output; indented
+    output (browsable API, ``; indent=`` media types) still goes through the
+    stdlib implementation.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        ret = orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+
+        # Keep the output a strict javascript subset, like JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,130 @@
+"""
+Failure isolation for calls to external services.
+
+``CircuitBreaker`` fails calls fast once a service keeps failing, and lets a
+single trial call through every ``reset_timeout`` seconds until one
+succeeds. ``Bulkhead`` caps how many calls run at once across every worker
+process, so a slow service can only tie up that many workers. Both raise a
+``GatewayUnavailable`` subclass instead of calling out, and report state
+changes through ``common.metrics``.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import caches
+
+from common import metrics
+
+
+class GatewayUnavailable(Exception):
+    reason = 'unavailable'
+
+    def __init__(self, name, retry_after):
+        super().__init__(f'{name} is unavailable ({self.reason}), retry in {retry_after}s')
+        self.retry_after = retry_after
+
+
+class CircuitOpen(GatewayUnavailable):
+    reason = 'circuit_open'
+
+
+class BulkheadFull(GatewayUnavailable):
+    reason = 'bulkhead_full'
+
+
+class CircuitBreaker:
+    """
+    Per-process circuit breaker. ``failure_threshold`` consecutive failures
+    open it; once ``reset_timeout`` has passed it goes half-open and lets
+    one call through, whose result closes it or opens it again.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Raise ``CircuitOpen`` unless a call may go through now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            waited = time.monotonic() - self.opened_at
+            if waited < self.reset_timeout:
+                raise CircuitOpen(self.name, max(1, round(self.reset_timeout - waited)))
+            # This call is the trial; the next one only goes through if it
+            # never reports back within another reset_timeout
+            self.opened_at = time.monotonic()
+            self._transition(self.HALF_OPEN)
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                if self.state != self.OPEN:
+                    self._transition(self.OPEN)
+
+    def _transition(self, state):
+        self.state = state
+        metrics.emit(
+            count={f'{self.name}.circuit.{state}': 1},
+            sample={f'{self.name}.circuit.open': int(state != self.CLOSED)},
+        )
+
+
+class Bulkhead:
+    """
+    At most ``limit`` concurrent calls across every process sharing the
+    ``cache_alias`` cache, no limit when it is 0. Each call holds one of
+    ``limit`` slot keys, taken with ``cache.add``; ``lease`` seconds bounds
+    how long a slot outlives a worker that died holding it. A call waits up
+    to ``wait`` seconds for a free slot before ``BulkheadFull``.
+    """
+    poll_interval = 0.05
+
+    def __init__(self, name, limit, lease, cache_alias='default', wait=0):
+        self.name = name
+        self.limit = limit
+        self.lease = lease
+        self.cache_alias = cache_alias
+        self.wait = wait
+
+    @contextmanager
+    def hold(self):
+        if not self.limit:
+            yield
+            return
+        key = self._acquire()
+        try:
+            yield
+        finally:
+            caches[self.cache_alias].delete(key)
+
+    def _acquire(self):
+        cache = caches[self.cache_alias]
+        deadline = time.monotonic() + self.wait
+        while True:
+            # Random order spreads workers over the slots instead of all racing for the first
+            for slot in random.sample(range(self.limit), self.limit):
+                key = f'bulkhead:{self.name}:{slot}'
+                if cache.add(key, 1, self.lease):
+                    return key
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(random.uniform(0, 2 * self.poll_interval))
+        metrics.emit(count={f'{self.name}.bulkhead.full': 1})
+        raise BulkheadFull(self.name, 1)
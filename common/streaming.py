@@ -0,0 +1,67 @@
+"""
+Streaming JSON arrays for list endpoints whose callers want every row.
+
+A streamed response iterates the queryset with ``.iterator(chunk_size=...)``
+and serializes and renders one chunk at a time, so worker memory stays flat
+whatever the size of the result. Views opt in per request with ``?stream=1``;
+without it they keep their paginated responses.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from common.pagination import KeysetPagination
+from common.renderers import FastJSONRenderer
+
+CHUNK_SIZE = getattr(settings, 'API_STREAM_CHUNK_SIZE', 500)
+STREAM_QUERY_PARAM = 'stream'
+
+
+def wants_stream(request):
+    return request.query_params.get(STREAM_QUERY_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def _render_chunks(queryset, serialize, chunk_size):
+    renderer = FastJSONRenderer()
+    yield b'['
+    separator = b''
+    chunk = []
+    for instance in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(instance)
+        if len(chunk) == chunk_size:
+            # Each rendered chunk is a complete array; splice its items in
+            yield separator + renderer.render(serialize(chunk))[1:-1]
+            separator, chunk = b',', []
+    if chunk:
+        yield separator + renderer.render(serialize(chunk))[1:-1]
+    yield b']'
+
+
+def stream_json(queryset, serialize, chunk_size=CHUNK_SIZE):
+    """
+    ``StreamingHttpResponse`` with the JSON array of ``queryset``, rendered
+    with ``serialize(instances)`` (a list of dicts) ``chunk_size`` rows at a
+    time. Rows come in ``KeysetPagination`` order, like the paged responses.
+    """
+    queryset = queryset.order_by(*KeysetPagination.ordering)
+    response = StreamingHttpResponse(
+        _render_chunks(queryset, serialize, chunk_size), content_type='application/json'
+    )
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class StreamingListMixin:
+    """
+    For ``ListAPIView`` subclasses: ``?stream=1`` returns every filtered row
+    as one streamed JSON array instead of a page.
+    """
+    stream_chunk_size = CHUNK_SIZE
+
+    def list(self, request, *args, **kwargs):
+        if not wants_stream(request):
+            return super().list(request, *args, **kwargs)
+        return stream_json(
+            self.filter_queryset(self.get_queryset()),
+            lambda instances: self.get_serializer(instances, many=True).data,
+            self.stream_chunk_size,
+        )
@@ -1,5 +1,11 @@
+import re
+
+from django.conf import settings
 from django.db import models
 
+# Country code assumed for phone numbers entered without one
+DEFAULT_PHONE_COUNTRY_CODE = getattr(settings, 'DEFAULT_PHONE_COUNTRY_CODE', '971')
+
 
 class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
@@ -8,3 +14,30 @@ class BaseModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+def normalize_email(value):
+    """Lookup form of an email address: trimmed and lower-cased"""
+    return (value or '').strip().lower()
+
+
+def normalize_phone(value, country_code=DEFAULT_PHONE_COUNTRY_CODE):
+    """
+    Lookup form of a phone number in E.164 (``+971501234567``).
+
+    Accepts ``+``/``00`` international prefixes, a national trunk ``0`` and
+    bare local numbers, which get ``country_code``. Separators are dropped.
+    """
+    value = (value or '').strip()
+    digits = re.sub(r'\D', '', value)
+    if not digits:
+        return ''
+    if value.startswith('+'):
+        return f'+{digits}'
+    if digits.startswith('00'):
+        return f'+{digits[2:]}'
+    if digits.startswith('0'):
+        return f'+{country_code}{digits[1:]}'
+    if digits.startswith(country_code) and len(digits) > 9:
+        return f'+{digits}'
+    return f'+{country_code}{digits}'